@@ -36,12 +36,14 @@ import sys
 import asyncio
 import json
 import datetime
+import functools
 import logging
-import base64
+import binascii
 import signal
 import threading
 import queue
 from typing import Union, Optional, Dict, Any, Mapping, Callable, TYPE_CHECKING, Awaitable, Tuple, cast
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 
 # Audio processing imports
@@ -88,25 +90,55 @@ from azure.ai.voicelive.models import (
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
-
-
-async def _wait_for_event(
-    conn,
-    wanted_types: set,
-    timeout_s: float = 10.0,
-    on_unhandled: Optional[Callable[[Any], Awaitable[None]]] = None,
-):
-    """Wait until we receive any event whose type is in wanted_types."""
-
-    async def _next():
-        while True:
-            evt = await conn.recv()
-            if evt.type in wanted_types:
-                return evt
-            if on_unhandled:
-                await on_unhandled(evt)
-
-    return await asyncio.wait_for(_next(), timeout=timeout_s)
+# Checked once; per-delta debug logs are skipped entirely unless debug logging is on at startup
+_DEBUG = logger.isEnabledFor(logging.DEBUG)
+
+_UTC = datetime.timezone.utc
+_TIME_FMT = "%I:%M:%S %p"
+_DATE_FMT = "%A, %B %d, %Y"
+
+# Maximum number of in-flight assistant transcripts kept before the oldest is discarded
+MAX_PENDING_TRANSCRIPTS = 32
+
+# Turn detection configuration
+_TURN_DETECTION_CONFIG = ServerVad(threshold=0.5, prefix_padding_ms=300, silence_duration_ms=500)
+
+# Function tools exposed to the assistant (built once, shared by every session)
+_FUNCTION_TOOLS: list[Tool] = [
+    FunctionTool(
+        name="get_current_time",
+        description="Get the current time",
+        parameters={
+            "type": "object",
+            "properties": {
+                "timezone": {
+                    "type": "string",
+                    "description": "The timezone to get the current time for, e.g., 'UTC', 'local'",
+                }
+            },
+            "required": [],
+        },
+    ),
+    FunctionTool(
+        name="get_current_weather",
+        description="Get the current weather in a given location",
+        parameters={
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "The city and state, e.g., 'San Francisco, CA'",
+                },
+                "unit": {
+                    "type": "string",
+                    "enum": ["celsius", "fahrenheit"],
+                    "description": "The unit of temperature to use (celsius or fahrenheit)",
+                },
+            },
+            "required": ["location"],
+        },
+    ),
+]
 
 
 async def _wait_for_match(
@@ -128,6 +160,19 @@ async def _wait_for_match(
     return await asyncio.wait_for(_next(), timeout=timeout_s)
 
 
+@functools.lru_cache(maxsize=128)
+def _simulated_weather(location: str, unit: str) -> Dict[str, Any]:
+    """Build the simulated weather report; cached, so callers must not mutate the result."""
+    return {
+        "location": location,
+        "temperature": 22 if unit == "celsius" else 72,
+        "unit": unit,
+        "condition": "Partly Cloudy",
+        "humidity": 65,
+        "wind_speed": 10,
+    }
+
+
 class AudioProcessor:
     """
     Handles real-time audio capture and playback for the voice assistant.
@@ -214,7 +259,7 @@ class AudioProcessor:
 
                 if audio_data and self.is_capturing:
                     # Convert to base64 and queue for sending
-                    audio_base64 = base64.b64encode(audio_data).decode("utf-8")
+                    audio_base64 = binascii.b2a_base64(audio_data, newline=False).decode("ascii")
                     self.audio_send_queue.put(audio_base64)
 
             except Exception as e:
@@ -379,8 +424,35 @@ class AsyncFunctionCallingClient:
         self.active_call_id: Optional[str] = None
         self.audio_processor: Optional[AudioProcessor] = None
         self.session_ready: bool = False
-        self._user_transcripts: Dict[str, str] = {}
-        self._assistant_transcripts: Dict[Tuple[str, str, int], str] = {}
+        self._assistant_transcripts: "OrderedDict[Tuple[str, str, int], list[str]]" = OrderedDict()
+
+        # Futures resolved by _handle_event for events in-flight function calls are waiting for,
+        # keyed by (event type, call_id); events without a call_id use None and wake every waiter
+        self._pending_events: Dict[Tuple[ServerEventType, Optional[str]], "list[asyncio.Future[Any]]"] = {}
+        self._function_call_tasks: set[asyncio.Task] = set()
+
+        # Event type -> handler, so each event is dispatched with a single lookup
+        self._event_handlers: Dict[ServerEventType, Callable[[Any, Any, AudioProcessor], Awaitable[None]]] = {
+            ServerEventType.SESSION_UPDATED: self._on_session_updated,
+            ServerEventType.INPUT_AUDIO_BUFFER_SPEECH_STARTED: self._on_speech_started,
+            ServerEventType.INPUT_AUDIO_BUFFER_SPEECH_STOPPED: self._on_speech_stopped,
+            ServerEventType.RESPONSE_CREATED: self._on_response_created,
+            ServerEventType.RESPONSE_TEXT_DELTA: self._on_text_delta,
+            ServerEventType.RESPONSE_AUDIO_DELTA: self._on_audio_delta,
+            ServerEventType.RESPONSE_AUDIO_DONE: self._on_audio_done,
+            ServerEventType.RESPONSE_DONE: self._on_response_done,
+            ServerEventType.ERROR: self._on_error,
+            ServerEventType.CONVERSATION_ITEM_CREATED: self._on_conversation_item_created,
+        }
+        # Transcript events are ignored outright (no accumulation) when transcriptions are hidden
+        if self.show_transcriptions:
+            self._event_handlers.update({
+                ServerEventType.CONVERSATION_ITEM_INPUT_AUDIO_TRANSCRIPTION_DELTA: self._on_user_transcription_delta,
+                ServerEventType.CONVERSATION_ITEM_INPUT_AUDIO_TRANSCRIPTION_COMPLETED: self._on_user_transcription_completed,
+                ServerEventType.CONVERSATION_ITEM_INPUT_AUDIO_TRANSCRIPTION_FAILED: self._on_user_transcription_failed,
+                ServerEventType.RESPONSE_AUDIO_TRANSCRIPT_DELTA: self._on_assistant_transcript_delta,
+                ServerEventType.RESPONSE_AUDIO_TRANSCRIPT_DONE: self._on_assistant_transcript_done,
+            })
 
         # Define available functions
         self.available_functions: Dict[str, Callable[[Union[str, Mapping[str, Any]]], Mapping[str, Any]]] = {
@@ -427,6 +499,13 @@ class AsyncFunctionCallingClient:
             logger.error(f"Connection error: {e}")
             raise
         finally:
+            # Snapshot: done callbacks remove tasks from the set while they finish
+            tasks = list(self._function_call_tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._assistant_transcripts.clear()
+
             # Cleanup audio processor
             if self.audio_processor:
                 await self.audio_processor.cleanup()
@@ -438,46 +517,6 @@ class AsyncFunctionCallingClient:
         # Create voice configuration
         voice_config = AzureStandardVoice(name=self.voice)
 
-        # Create turn detection configuration
-        turn_detection_config = ServerVad(threshold=0.5, prefix_padding_ms=300, silence_duration_ms=500)
-
-        # Define available function tools
-        function_tools: list[Tool] = [
-            FunctionTool(
-                name="get_current_time",
-                description="Get the current time",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "timezone": {
-                            "type": "string",
-                            "description": "The timezone to get the current time for, e.g., 'UTC', 'local'",
-                        }
-                    },
-                    "required": [],
-                },
-            ),
-            FunctionTool(
-                name="get_current_weather",
-                description="Get the current weather in a given location",
-                parameters={
-                    "type": "object",
-                    "properties": {
-                        "location": {
-                            "type": "string",
-                            "description": "The city and state, e.g., 'San Francisco, CA'",
-                        },
-                        "unit": {
-                            "type": "string",
-                            "enum": ["celsius", "fahrenheit"],
-                            "description": "The unit of temperature to use (celsius or fahrenheit)",
-                        },
-                    },
-                    "required": ["location"],
-                },
-            ),
-        ]
-
         # Create session configuration with function tools
         session_config = RequestSession(
             modalities=[Modality.TEXT, Modality.AUDIO],
@@ -486,8 +525,8 @@ class AsyncFunctionCallingClient:
             input_audio_format=InputAudioFormat.PCM16,
             output_audio_format=OutputAudioFormat.PCM16,
             input_audio_echo_cancellation=AudioEchoCancellation(),
-            turn_detection=turn_detection_config,
-            tools=function_tools,
+            turn_detection=_TURN_DETECTION_CONFIG,
+            tools=_FUNCTION_TOOLS,
             tool_choice=ToolChoiceLiteral.AUTO,  # Let the model decide when to call functions
             input_audio_transcription=AudioInputTranscriptionSettings(model="whisper-1"),
         )
@@ -512,140 +551,173 @@ class AsyncFunctionCallingClient:
         ap = self.audio_processor
         assert ap is not None, "AudioProcessor must be initialized"
 
-        if event.type == ServerEventType.SESSION_UPDATED:
-            self.session_id = event.session.id
-            logger.info(f"Session ready: {self.session_id}")
-            self.session_ready = True
-
-            # Start audio capture once session is ready
-            await ap.start_capture()
-            print("🎤 Ready for voice input! Try asking about time or weather with your location...")
+        # Events a function call is waiting for are delivered to it instead of the regular handler
+        waiters = self._pending_events.pop((event.type, getattr(event, "call_id", None)), None)
+        if waiters:
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(event)
+            return
 
-        elif event.type == ServerEventType.INPUT_AUDIO_BUFFER_SPEECH_STARTED:
-            logger.info("🎤 User started speaking - stopping playback")
-            print("🎤 Listening...")
+        handler = self._event_handlers.get(event.type)
+        if handler is not None:
+            await handler(event, connection, ap)
 
-            # Stop current assistant audio playback (interruption handling)
-            await ap.stop_playback()
+    async def _on_session_updated(self, event, connection, ap: AudioProcessor):
+        self.session_id = event.session.id
+        logger.info(f"Session ready: {self.session_id}")
+        self.session_ready = True
 
-            # Cancel any ongoing response
-            try:
-                await connection.response.cancel()
-            except Exception as e:
-                logger.debug(f"No response to cancel: {e}")
+        # Start audio capture once session is ready
+        await ap.start_capture()
+        print("🎤 Ready for voice input! Try asking about time or weather with your location...")
 
-        elif event.type == ServerEventType.INPUT_AUDIO_BUFFER_SPEECH_STOPPED:
-            logger.info("🎤 User stopped speaking")
-            print("🤔 Processing...")
+    async def _on_speech_started(self, event, connection, ap: AudioProcessor):
+        logger.info("🎤 User started speaking - stopping playback")
+        print("🎤 Listening...")
 
-            # Restart playback system for response
-            await ap.start_playback()
+        # Stop current assistant audio playback (interruption handling)
+        await ap.stop_playback()
 
-        elif event.type == ServerEventType.RESPONSE_CREATED:
-            logger.info("🤖 Assistant response created")
+        # Cancel any ongoing response
+        try:
+            await connection.response.cancel()
+        except Exception as e:
+            logger.debug(f"No response to cancel: {e}")
 
-        elif event.type == ServerEventType.RESPONSE_TEXT_DELTA:
-            logger.info(f"Text response: {event.delta}")
+    async def _on_speech_stopped(self, event, connection, ap: AudioProcessor):
+        logger.info("🎤 User stopped speaking")
+        print("🤔 Processing...")
 
-        elif event.type == ServerEventType.RESPONSE_AUDIO_DELTA:
-            # Stream audio response to speakers
-            logger.debug("Received audio delta")
-            await ap.queue_audio(event.delta)
+        # Restart playback system for response
+        await ap.start_playback()
 
-        elif event.type == ServerEventType.RESPONSE_AUDIO_DONE:
-            logger.info("🤖 Assistant finished speaking")
-            print("🎤 Ready for next input...")
+    async def _on_response_created(self, event, connection, ap: AudioProcessor):
+        logger.info("🤖 Assistant response created")
 
-        elif event.type == ServerEventType.RESPONSE_DONE:
-            logger.info("✅ Response complete")
-            self.function_call_in_progress = False
-            self.active_call_id = None
+    async def _on_text_delta(self, event, connection, ap: AudioProcessor):
+        logger.info(f"Text response: {event.delta}")
 
-        elif event.type == ServerEventType.CONVERSATION_ITEM_INPUT_AUDIO_TRANSCRIPTION_DELTA:
-            if self.show_transcriptions:
-                item_id = getattr(event, "item_id", None)
-                delta = getattr(event, "delta", None)
-                if item_id and delta:
-                    transcript = self._user_transcripts.get(item_id, "") + delta
-                    self._user_transcripts[item_id] = transcript
-                    logger.debug(f"User transcription delta ({item_id}): {delta}")
-
-        elif event.type == ServerEventType.CONVERSATION_ITEM_INPUT_AUDIO_TRANSCRIPTION_COMPLETED:
-            if self.show_transcriptions:
-                item_id = getattr(event, "item_id", None)
-                transcript = getattr(event, "transcript", "")
-                if item_id and transcript:
-                    self._user_transcripts[item_id] = transcript
-                    logger.info(f"User transcription completed ({item_id}): {transcript}")
-                    print(f"🗣️ You said: {transcript}")
-
-        elif event.type == ServerEventType.CONVERSATION_ITEM_INPUT_AUDIO_TRANSCRIPTION_FAILED:
-            if self.show_transcriptions:
-                item_id = getattr(event, "item_id", None)
-                error = getattr(event, "error", None)
-                error_msg = getattr(error, "message", None) if error else None
-                logger.warning(
-                    "User transcription failed (%s): %s",
-                    item_id,
-                    error_msg or error or "unknown error",
-                )
-                print("⚠️ Unable to transcribe your last utterance. Please try again.")
-
-        elif event.type == ServerEventType.RESPONSE_AUDIO_TRANSCRIPT_DELTA:
-            if self.show_transcriptions:
-                key = (
-                    getattr(event, "response_id", ""),
-                    getattr(event, "item_id", ""),
-                    getattr(event, "output_index", -1),
+    async def _on_audio_delta(self, event, connection, ap: AudioProcessor):
+        # Stream audio response to speakers
+        if _DEBUG:
+            logger.debug("Received audio delta")
+        await ap.queue_audio(event.delta)
+
+    async def _on_audio_done(self, event, connection, ap: AudioProcessor):
+        logger.info("🤖 Assistant finished speaking")
+        print("🎤 Ready for next input...")
+
+    async def _on_response_done(self, event, connection, ap: AudioProcessor):
+        logger.info("✅ Response complete")
+        self.function_call_in_progress = False
+        self.active_call_id = None
+
+    async def _on_user_transcription_delta(self, event, connection, ap: AudioProcessor):
+        item_id = event.item_id
+        delta = event.delta
+        if item_id and delta:
+            if _DEBUG:
+                logger.debug("User transcription delta (%s): %s", item_id, delta)
+
+    async def _on_user_transcription_completed(self, event, connection, ap: AudioProcessor):
+        item_id = event.item_id
+        transcript = event.transcript
+        if item_id and transcript:
+            logger.info(f"User transcription completed ({item_id}): {transcript}")
+            print(f"🗣️ You said: {transcript}")
+
+    async def _on_user_transcription_failed(self, event, connection, ap: AudioProcessor):
+        item_id = event.item_id
+        error = event.error
+        error_msg = error.message if error else None
+        logger.warning(
+            "User transcription failed (%s): %s",
+            item_id,
+            error_msg or error or "unknown error",
+        )
+        print("⚠️ Unable to transcribe your last utterance. Please try again.")
+
+    async def _on_assistant_transcript_delta(self, event, connection, ap: AudioProcessor):
+        key = (event.response_id, event.item_id, event.output_index)
+        delta = event.delta
+        if key[0] and key[1] and key[2] >= 0 and delta is not None:
+            self._assistant_transcripts.setdefault(key, []).append(delta)
+            # Responses cancelled before RESPONSE_AUDIO_TRANSCRIPT_DONE never pop their entry
+            if len(self._assistant_transcripts) > MAX_PENDING_TRANSCRIPTS:
+                self._assistant_transcripts.popitem(last=False)
+            if _DEBUG:
+                logger.debug(
+                    "Assistant transcription delta (%s, %s, %s): %s",
+                    key[0],
+                    key[1],
+                    key[2],
+                    delta,
                 )
-                delta = getattr(event, "delta", None)
-                if key[0] and key[1] and key[2] >= 0 and delta is not None:
-                    current = self._assistant_transcripts.get(key, "") + delta
-                    self._assistant_transcripts[key] = current
-                    logger.debug(
-                        "Assistant transcription delta (%s, %s, %s): %s",
-                        key[0],
-                        key[1],
-                        key[2],
-                        delta,
-                    )
 
-        elif event.type == ServerEventType.RESPONSE_AUDIO_TRANSCRIPT_DONE:
-            if self.show_transcriptions:
-                key = (
-                    getattr(event, "response_id", ""),
-                    getattr(event, "item_id", ""),
-                    getattr(event, "output_index", -1),
+    async def _on_assistant_transcript_done(self, event, connection, ap: AudioProcessor):
+        key = (event.response_id, event.item_id, event.output_index)
+        transcript = event.transcript
+        if key[0] and key[1] and key[2] >= 0:
+            deltas = self._assistant_transcripts.pop(key, None)
+            if not transcript and deltas:
+                transcript = "".join(deltas)
+            if transcript:
+                logger.info(
+                    "Assistant transcription completed (%s, %s, %s): %s",
+                    key[0],
+                    key[1],
+                    key[2],
+                    transcript,
                 )
-                transcript = getattr(event, "transcript", "")
-                if key[0] and key[1] and key[2] >= 0:
-                    if not transcript:
-                        transcript = self._assistant_transcripts.get(key, "")
-                    if transcript:
-                        self._assistant_transcripts[key] = transcript
-                        logger.info(
-                            "Assistant transcription completed (%s, %s, %s): %s",
-                            key[0],
-                            key[1],
-                            key[2],
-                            transcript,
-                        )
-                        print(f"🤖 Assistant said: {transcript}")
-                    self._assistant_transcripts.pop(key, None)
-
-        elif event.type == ServerEventType.ERROR:
-            logger.error(f"❌ VoiceLive error: {event.error.message}")
-            print(f"Error: {event.error.message}")
-
-        elif event.type == ServerEventType.CONVERSATION_ITEM_CREATED:
-            logger.info(f"Conversation item created: {event.item.id}")
-
-            # Check if it's a function call item using the improved pattern from the test
-            if event.item.type == ItemType.FUNCTION_CALL:
-                print(f"🔧 Calling function: {event.item.name}")
-                await self._handle_function_call_with_improved_pattern(event, connection)
-
-    async def _handle_function_call_with_improved_pattern(self, conversation_created_event, connection):
+                print(f"🤖 Assistant said: {transcript}")
+
+    async def _on_error(self, event, connection, ap: AudioProcessor):
+        logger.error(f"❌ VoiceLive error: {event.error.message}")
+        print(f"Error: {event.error.message}")
+
+    async def _on_conversation_item_created(self, event, connection, ap: AudioProcessor):
+        logger.info(f"Conversation item created: {event.item.id}")
+
+        # Check if it's a function call item using the improved pattern from the test
+        if event.item.type == ItemType.FUNCTION_CALL:
+            print(f"🔧 Calling function: {event.item.name}")
+            # Register the waiters before yielding back to _process_events so neither event can slip past
+            # Arguments are matched by call_id so parallel tool calls each get their own event;
+            # they all finish with the same RESPONSE_DONE
+            arguments_done = self._expect_event(
+                ServerEventType.RESPONSE_FUNCTION_CALL_ARGUMENTS_DONE, event.item.call_id
+            )
+            response_done = self._expect_event(ServerEventType.RESPONSE_DONE)
+
+            # Run the call in its own task so _process_events stays the only consumer of the connection
+            task = asyncio.create_task(
+                self._handle_function_call_with_improved_pattern(event, connection, arguments_done, response_done)
+            )
+            self._function_call_tasks.add(task)
+            task.add_done_callback(self._function_call_tasks.discard)
+            task.add_done_callback(lambda _: self._discard_waiters(arguments_done, response_done))
+
+    def _expect_event(self, event_type: ServerEventType, call_id: Optional[str] = None) -> "asyncio.Future[Any]":
+        """Register a future that _handle_event resolves with the next event of event_type (and call_id)."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._pending_events.setdefault((event_type, call_id), []).append(waiter)
+        return waiter
+
+    def _discard_waiters(self, *waiters: "asyncio.Future[Any]"):
+        """Unregister waiters that were never resolved (e.g. after a timeout)."""
+        for key, pending in list(self._pending_events.items()):
+            pending[:] = [waiter for waiter in pending if waiter not in waiters]
+            if not pending:
+                del self._pending_events[key]
+
+    async def _handle_function_call_with_improved_pattern(
+        self,
+        conversation_created_event,
+        connection,
+        arguments_done: "asyncio.Future[Any]",
+        response_done: "asyncio.Future[Any]",
+    ):
         """Handle function call using the improved pattern from the test."""
         # Validate the event structure
         if not isinstance(conversation_created_event, ServerEventConversationItemCreated):
@@ -668,15 +740,8 @@ class AsyncFunctionCallingClient:
             self.function_call_in_progress = True
             self.active_call_id = call_id
 
-            # Wait for the function arguments to be complete
-            async def _forward_event(evt):
-                await self._handle_event(evt, connection)
-
-            function_done = await _wait_for_event(
-                connection,
-                {ServerEventType.RESPONSE_FUNCTION_CALL_ARGUMENTS_DONE},
-                on_unhandled=_forward_event,
-            )
+            # Wait for the function arguments to be complete; other events keep flowing through _process_events
+            function_done = await asyncio.wait_for(arguments_done, timeout=10.0)
 
             if not isinstance(function_done, ServerEventResponseFunctionCallArgumentsDone):
                 logger.error("Expected ServerEventResponseFunctionCallArgumentsDone")
@@ -690,11 +755,7 @@ class AsyncFunctionCallingClient:
             logger.info(f"Function arguments received: {arguments}")
 
             # Wait for response to be done before proceeding
-            await _wait_for_event(
-                connection,
-                {ServerEventType.RESPONSE_DONE},
-                on_unhandled=_forward_event,
-            )
+            await asyncio.wait_for(response_done, timeout=10.0)
 
             # Execute the function if we have it
             if function_name in self.available_functions:
@@ -737,16 +798,16 @@ class AsyncFunctionCallingClient:
             args = {}
 
         timezone = args.get("timezone", "local")
-        now = datetime.datetime.now()
 
         if timezone.lower() == "utc":
-            now = datetime.datetime.now(datetime.timezone.utc)
+            now = datetime.datetime.now(_UTC)
             timezone_name = "UTC"
         else:
+            now = datetime.datetime.now()
             timezone_name = "local"
 
-        formatted_time = now.strftime("%I:%M:%S %p")
-        formatted_date = now.strftime("%A, %B %d, %Y")
+        formatted_time = now.strftime(_TIME_FMT)
+        formatted_date = now.strftime(_DATE_FMT)
 
         return {"time": formatted_time, "date": formatted_date, "timezone": timezone_name}
 
@@ -770,16 +831,7 @@ class AsyncFunctionCallingClient:
         # In a real application, you would call a weather API
         # This is a simulated response similar to the test
         try:
-            weather_data = {
-                "location": location,
-                "temperature": 22 if unit == "celsius" else 72,
-                "unit": unit,
-                "condition": "Partly Cloudy",
-                "humidity": 65,
-                "wind_speed": 10,
-            }
-
-            return weather_data
+            return _simulated_weather(location, unit)
 
         except Exception as e:
             logger.error(f"Error getting weather: {e}")
@@ -5,19 +5,23 @@ Provides WebSocket endpoints for real-time audio streaming and speech-to-speech
 
 import os
 import asyncio
-import json
-import base64
+import binascii
 import datetime
+import inspect
 import logging
-from typing import Dict, Any, Mapping, Optional, Union, Callable
+import math
+import time
+import orjson
+from collections import deque
+from typing import AbstractSet, Dict, Any, Awaitable, Deque, Mapping, Optional, Tuple, Union, Callable
 from contextlib import asynccontextmanager
+from types import MappingProxyType
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from azure.core.credentials import AzureKeyCredential
-from azure.identity import DefaultAzureCredential
 from azure.ai.voicelive.aio import connect
 from azure.ai.voicelive.models import (
     RequestSession,
@@ -33,8 +37,6 @@ from azure.ai.voicelive.models import (
     ItemType,
     ToolChoiceLiteral,
     # AudioInputTranscriptionSettings,
-    ResponseFunctionCallItem,
-    ServerEventConversationItemCreated,
     ServerEventResponseFunctionCallArgumentsDone,
     Tool,
 )
@@ -49,13 +51,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Values accepted as "on" for boolean environment flags
+_TRUTHY = frozenset({"1", "true", "yes", "on"})
+
+# Azure configuration (environment is read once at import, not per connection)
+AZURE_VOICELIVE_ENDPOINT = os.environ.get("AZURE_VOICELIVE_ENDPOINT", "")
+AZURE_VOICELIVE_MODEL = os.environ.get("AZURE_VOICELIVE_MODEL", "")
+AZURE_VOICELIVE_SHOW_TRANSCRIPTIONS = os.environ.get("AZURE_VOICELIVE_SHOW_TRANSCRIPTIONS", "True").lower() in _TRUTHY
+# API key is optional - for local development fallback
+AZURE_VOICELIVE_API_KEY = os.environ.get("AZURE_VOICELIVE_API_KEY", "")
+
+# Use DefaultAzureCredential (supports managed identity, Azure CLI, environment variables, etc.)
+# Falls back to API key if explicitly provided. A single instance is shared by all
+# connections so credential discovery and the token cache are not repeated per session.
+if AZURE_VOICELIVE_API_KEY:
+    CREDENTIAL: Any = AzureKeyCredential(AZURE_VOICELIVE_API_KEY)
+    logger.info("Using API key credential")
+else:
+    # azure.identity pulls in msal and cryptography, so it is only imported when used.
+    # The async variant keeps token acquisition from blocking the event loop.
+    from azure.identity.aio import DefaultAzureCredential
+    CREDENTIAL = DefaultAzureCredential()
+    logger.info("Using DefaultAzureCredential (managed identity)")
+
 
 # Lifespan context manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for FastAPI app."""
     logger.info("Starting Voice Live Assistant Backend")
+    # Load the MPSV knowledge base once instead of on every function call
+    app.state.mpsv_kb = await asyncio.to_thread(_read_kb_file, KB_FILE_PATH)
     yield
+    # The shared credential lives for the whole process; release its HTTP session on shutdown
+    if not isinstance(CREDENTIAL, AzureKeyCredential):
+        await CREDENTIAL.close()
     logger.info("Shutting down Voice Live Assistant Backend")
 
 
@@ -85,57 +115,71 @@ class HealthResponse(BaseModel):
 
 
 # Helper functions for function calling
+_EMPTY_ARGS: Mapping[str, Any] = MappingProxyType({})
+
+
+def _coerce_args(arguments: Optional[Union[str, bytes, Mapping[str, Any]]]) -> Optional[Mapping[str, Any]]:
+    """Normalize function call arguments to a mapping.
+
+    Returns None if the arguments are a JSON string that does not decode to an object.
+    """
+    if isinstance(arguments, Mapping):
+        return arguments
+    if isinstance(arguments, (str, bytes)) and arguments:
+        try:
+            args = orjson.loads(arguments)
+        except orjson.JSONDecodeError:
+            return None
+        return args if isinstance(args, dict) else None
+    return _EMPTY_ARGS
+
+
+_UTC = datetime.timezone.utc
+_TIME_FMT = "%I:%M:%S %p"
+_DATE_FMT = "%A, %B %d, %Y"
+_UTC_ALIASES = frozenset({"utc", "UTC", "Utc", "gmt", "GMT"})
+
 def get_current_time(arguments: Optional[Union[str, Mapping[str, Any]]] = None) -> Dict[str, Any]:
     """Get the current time."""
-    if isinstance(arguments, str):
-        try:
-            args = json.loads(arguments)
-        except json.JSONDecodeError:
-            args = {}
-    elif isinstance(arguments, dict):
-        args = arguments
-    else:
-        args = {}
+    args = _coerce_args(arguments) or _EMPTY_ARGS
 
     timezone = args.get("timezone", "local")
-    now = datetime.datetime.now()
 
-    if timezone.lower() == "utc":
-        now = datetime.datetime.now(datetime.timezone.utc)
+    if timezone in _UTC_ALIASES:
+        now = datetime.datetime.now(_UTC)
         timezone_name = "UTC"
     else:
+        now = datetime.datetime.now()
         timezone_name = "local"
 
-    formatted_time = now.strftime("%I:%M:%S %p")
-    formatted_date = now.strftime("%A, %B %d, %Y")
-
     return {
-        "time": formatted_time,
-        "date": formatted_date,
+        "time": now.strftime(_TIME_FMT),
+        "date": now.strftime(_DATE_FMT),
         "timezone": timezone_name
     }
 
 
-def get_current_weather(arguments: Union[str, Mapping[str, Any]]) -> Dict[str, Any]:
+# Simulated latency of the mock weather and MPSV APIs, in seconds
+WEATHER_API_DELAY_S = 3.0
+MPSV_API_DELAY_S = 6.0
+
+
+async def get_current_weather(arguments: Union[str, Mapping[str, Any]]) -> Dict[str, Any]:
     """Get the current weather for a location."""
-    if isinstance(arguments, str):
-        try:
-            args = json.loads(arguments)
-        except json.JSONDecodeError:
-            logger.error(f"Failed to parse weather arguments: {arguments}")
-            return {"error": "Invalid arguments"}
-    elif isinstance(arguments, dict):
-        args = arguments
-    else:
+    if not isinstance(arguments, (str, bytes, Mapping)):
         return {"error": "No arguments provided"}
+    args = _coerce_args(arguments)
+    # An empty string is not valid JSON, so it is rejected like any other malformed payload
+    if args is None or args is _EMPTY_ARGS:
+        logger.error("Failed to parse weather arguments: %s", arguments)
+        return {"error": "Invalid arguments"}
 
     location = args.get("location", "Unknown")
     unit = args.get("unit", "celsius")
 
-    # sleep for 4 seconds to simulate API call
-    import time
+    # sleep to simulate API call, without blocking the event loop
     print("Entering sleep to simulate weather API call...")
-    time.sleep(3)
+    await asyncio.sleep(WEATHER_API_DELAY_S)
     print("Exiting sleep...")
 
     # Mock weather data (in production, call a real weather API)
@@ -151,34 +195,34 @@ def get_current_weather(arguments: Union[str, Mapping[str, Any]]) -> Dict[str, A
     return weather_data
 
 
-def get_mpsv_info(arguments: Optional[Union[str, Mapping[str, Any]]] = None) -> Dict[str, Any]:
+KB_FILE_PATH = os.path.join(os.path.dirname(__file__), "test-kb.txt")
+
+
+def _read_kb_file(kb_file_path: str) -> str:
+    """Read the knowledge base file (blocking; run it off the event loop)."""
+    try:
+        with open(kb_file_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        logger.error("Knowledge base file not found: %s", kb_file_path)
+        return ""
+
+
+async def get_mpsv_info(arguments: Optional[Union[str, Mapping[str, Any]]] = None) -> Dict[str, Any]:
     """Get information about social benefits from MPSV (Ministry of Labour and Social Affairs)."""
-    if isinstance(arguments, str):
-        try:
-            args = json.loads(arguments)
-        except json.JSONDecodeError:
-            args = {}
-    elif isinstance(arguments, dict):
-        args = arguments
-    else:
-        args = {}
+    args = _coerce_args(arguments) or _EMPTY_ARGS
 
     query = args.get("query", "")
     
     # TODO: Implement actual MPSV info retrieval
 
-    # Read info from knowledge base file
-    kb_file_path = os.path.join(os.path.dirname(__file__), "test-kb.txt")
-    try:
-        with open(kb_file_path, "r", encoding="utf-8") as f:
-            info = f.read()
-    except FileNotFoundError:
-        logger.error(f"Knowledge base file not found: {kb_file_path}")
-        info = ""
+    # Knowledge base is loaded at startup; read it here only if startup did not run
+    info = getattr(app.state, "mpsv_kb", None)
+    if info is None:
+        info = app.state.mpsv_kb = await asyncio.to_thread(_read_kb_file, KB_FILE_PATH)
 
-    import time
     print("Entering sleep to simulate weather API call...")
-    time.sleep(6)
+    await asyncio.sleep(MPSV_API_DELAY_S)
     print("Exiting sleep...")
     
     return {
@@ -186,13 +230,57 @@ def get_mpsv_info(arguments: Optional[Union[str, Mapping[str, Any]]] = None) ->
         "query": query  
     }
 
-# Available functions for the assistant
-AVAILABLE_FUNCTIONS: Dict[str, Callable[[Union[str, Mapping[str, Any]]], Mapping[str, Any]]] = {
+# Available functions for the assistant; entries may be plain functions or coroutine functions
+AVAILABLE_FUNCTIONS: Dict[str, Callable[[Union[str, Mapping[str, Any]]], Union[Mapping[str, Any], Awaitable[Mapping[str, Any]]]]] = {
     "get_current_time": get_current_time,
     "get_current_weather": get_current_weather,
     "get_mpsv_info": get_mpsv_info,
 }
 
+
+# Seconds a function result stays cached, keyed by function name and arguments.
+# Only deterministic functions are listed; anything else always runs.
+FUNCTION_CACHE_TTL: Dict[str, float] = {
+    "get_current_weather": 300.0,
+    "get_mpsv_info": math.inf,
+}
+FUNCTION_CACHE_SIZE = 256
+
+_function_result_cache: Dict[Tuple[str, bytes], Tuple[float, Mapping[str, Any]]] = {}
+
+
+async def call_function(function_name: str, arguments: Union[str, Mapping[str, Any]]) -> Tuple[Mapping[str, Any], bool]:
+    """
+    Run an entry from AVAILABLE_FUNCTIONS, awaiting it if it is a coroutine function.
+
+    Results of functions listed in FUNCTION_CACHE_TTL are served from cache while fresh.
+    Returns the result and whether it came from the cache.
+    """
+    ttl = FUNCTION_CACHE_TTL.get(function_name)
+    cache_key = None
+    if ttl is not None:
+        args = _coerce_args(arguments)
+        if args is not None:
+            # dict() because orjson cannot serialize the read-only _EMPTY_ARGS proxy
+            cache_key = (function_name, orjson.dumps(dict(args), option=orjson.OPT_SORT_KEYS))
+            cached = _function_result_cache.get(cache_key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1], True
+
+    function = AVAILABLE_FUNCTIONS[function_name]
+    if inspect.iscoroutinefunction(function):
+        result = await function(arguments)
+    else:
+        result = function(arguments)
+
+    if cache_key is not None and "error" not in result:
+        if len(_function_result_cache) >= FUNCTION_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            del _function_result_cache[next(iter(_function_result_cache))]
+        _function_result_cache[cache_key] = (time.monotonic() + ttl, result)
+    return result, False
+
+
 # Available locales for the assistant
 AVAILABLE_LOCALES: Dict[str, Dict[str, str]] = {
     "en-US": {
@@ -253,7 +341,76 @@ DEFAULT_VOICE_BY_LOCALE: Dict[str, str] = {
 }
 
 
-async def wait_for_event(conn, wanted_types: set, timeout_s: float = 10.0, on_unhandled=None):
+def _build_voices_response(locale: Optional[str]) -> bytes:
+    if locale is not None:
+        voices = [v for v in AVAILABLE_VOICES.values() if v["locale"] == locale]
+        default = DEFAULT_VOICE_BY_LOCALE.get(locale, DEFAULT_VOICE_ID)
+    else:
+        voices = list(AVAILABLE_VOICES.values())
+        default = DEFAULT_VOICE_ID
+    return orjson.dumps({
+        "voices": voices,
+        "default": default
+    })
+
+
+# Pre-serialized /locales and /voices bodies; the catalogs are static
+LOCALES_RESPONSE = orjson.dumps({
+    "locales": list(AVAILABLE_LOCALES.values()),
+    "default": DEFAULT_LOCALE_ID
+})
+VOICES_RESPONSES: Dict[Optional[str], bytes] = {
+    locale: _build_voices_response(locale) for locale in (None, *AVAILABLE_LOCALES)
+}
+
+# Voice configuration per voice ID
+VOICE_CONFIGS: Dict[str, AzureStandardVoice] = {
+    voice_id: AzureStandardVoice(name=voice_data["voice"], locale=voice_data["locale"], rate="1.0")
+    for voice_id, voice_data in AVAILABLE_VOICES.items()
+}
+
+
+# Upper bound for a single audio frame from the client
+# (~1 s of 24 kHz PCM16 mono; the frontend sends ~200 ms frames)
+MAX_CLIENT_AUDIO_BYTES = 48_000
+MAX_CLIENT_AUDIO_B64_LEN = 64_000
+
+# Binary frames in both directions start with a one-byte frame type; 0x01 is PCM16 audio
+AUDIO_FRAME = 0x01
+AUDIO_FRAME_PREFIX = bytes([AUDIO_FRAME])
+
+# Maximum number of client audio frames buffered before the oldest is dropped
+INBOUND_QUEUE_SIZE = 16
+
+# Maximum number of frames buffered for a client before audio is dropped
+OUTBOUND_QUEUE_SIZE = 64
+
+# Maximum number of queued text messages coalesced into one "batch" frame
+MAX_BATCH_MESSAGES = 32
+_BATCH_PREFIX = '{"type":"batch","messages":['
+_BATCH_SUFFIX = "]}"
+
+# Static messages, serialized once at import instead of per connection
+MSG_MISSING_ENDPOINT = orjson.dumps({
+    "type": "error",
+    "message": "Server configuration error: Missing endpoint"
+}).decode("utf-8")
+MSG_MISSING_MODEL = orjson.dumps({
+    "type": "error",
+    "message": "Server configuration error: Missing model"
+}).decode("utf-8")
+MSG_READY = orjson.dumps({
+    "type": "ready",
+    "message": "Voice assistant ready"
+}).decode("utf-8")
+MSG_USER_STARTED_SPEAKING = orjson.dumps({"type": "user_started_speaking"}).decode("utf-8")
+MSG_USER_STOPPED_SPEAKING = orjson.dumps({"type": "user_stopped_speaking"}).decode("utf-8")
+MSG_ASSISTANT_RESPONSE_STARTED = orjson.dumps({"type": "assistant_response_started"}).decode("utf-8")
+MSG_ASSISTANT_RESPONSE_ENDED = orjson.dumps({"type": "assistant_response_ended"}).decode("utf-8")
+MSG_RESPONSE_COMPLETE = orjson.dumps({"type": "response_complete"}).decode("utf-8")
+
+
+async def wait_for_event(conn, wanted_types: AbstractSet[ServerEventType], timeout_s: float = 10.0, on_unhandled=None):
     """Wait until we receive any event whose type is in wanted_types."""
     async def _next():
         while True:
@@ -266,6 +423,69 @@ async def wait_for_event(conn, wanted_types: set, timeout_s: float = 10.0, on_un
     return await asyncio.wait_for(_next(), timeout=timeout_s)
 
 
+async def send_message(websocket: Union[WebSocket, "ClientOutbox"], message: Mapping[str, Any]) -> None:
+    """Serialize a message with orjson and send it to the client as a text frame."""
+    await websocket.send_text(orjson.dumps(message).decode("utf-8"))
+
+
+class ClientOutbox:
+    """
+    Bounded buffer of outbound frames between VoiceLive and the client WebSocket.
+
+    VoiceLive events are queued here and written to the client by a dedicated
+    sender task, so a slow client never stalls the VoiceLive event loop. When the
+    buffer is full the oldest queued audio frame is dropped; control messages
+    are always kept. Text messages that queue up back to back are sent together
+    as a single ``batch`` frame.
+    """
+
+    __slots__ = ("_frames", "_maxsize", "_ready")
+
+    def __init__(self, maxsize: int = OUTBOUND_QUEUE_SIZE):
+        self._frames: Deque[Tuple[Union[str, bytes], bool]] = deque()
+        self._maxsize = maxsize
+        self._ready = asyncio.Event()
+
+    async def send_text(self, text: str, droppable: bool = False) -> None:
+        """Queue a text frame; droppable frames may be discarded under back-pressure."""
+        self._put(text, droppable)
+
+    async def send_bytes(self, data: bytes, droppable: bool = False) -> None:
+        """Queue a binary frame; droppable frames may be discarded under back-pressure."""
+        self._put(data, droppable)
+
+    def _put(self, frame: Union[str, bytes], droppable: bool) -> None:
+        if len(self._frames) >= self._maxsize:
+            self._drop_oldest_audio()
+        self._frames.append((frame, droppable))
+        self._ready.set()
+
+    def _drop_oldest_audio(self) -> None:
+        for index, (_, droppable) in enumerate(self._frames):
+            if droppable:
+                del self._frames[index]
+                return
+
+    async def run(self, websocket: WebSocket) -> None:
+        """Write queued frames to the client until cancelled."""
+        while True:
+            while not self._frames:
+                self._ready.clear()
+                await self._ready.wait()
+            frame, _ = self._frames.popleft()
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+                continue
+            # Coalesce text messages already waiting behind this one; never delay to wait for more
+            if self._frames and isinstance(self._frames[0][0], str):
+                texts = [frame]
+                while (self._frames and isinstance(self._frames[0][0], str)
+                       and len(texts) < MAX_BATCH_MESSAGES):
+                    texts.append(self._frames.popleft()[0])
+                frame = _BATCH_PREFIX + ",".join(texts) + _BATCH_SUFFIX
+            await websocket.send_text(frame)
+
+
 # API Routes
 @app.get("/", response_model=HealthResponse)
 async def health_check():
@@ -282,26 +502,14 @@ async def health():
 @app.get("/locales")
 async def get_locales():
     """Get available locales/languages for the assistant."""
-    return {
-        "locales": list(AVAILABLE_LOCALES.values()),
-        "default": DEFAULT_LOCALE_ID
-    }
+    return Response(content=LOCALES_RESPONSE, media_type="application/json")
 
 
 @app.get("/voices")
 async def get_voices(locale: str = None):
     """Get available voices for the assistant, optionally filtered by locale."""
-    if locale and locale in AVAILABLE_LOCALES:
-        voices = [v for v in AVAILABLE_VOICES.values() if v["locale"] == locale]
-        default = DEFAULT_VOICE_BY_LOCALE.get(locale, DEFAULT_VOICE_ID)
-    else:
-        voices = list(AVAILABLE_VOICES.values())
-        default = DEFAULT_VOICE_ID
-    
-    return {
-        "voices": voices,
-        "default": default
-    }
+    content = VOICES_RESPONSES.get(locale, VOICES_RESPONSES[None])
+    return Response(content=content, media_type="application/json")
 
 
 @app.websocket("/ws/voice")
@@ -318,101 +526,105 @@ async def websocket_voice_endpoint(websocket: WebSocket):
     await websocket.accept()
     logger.info("WebSocket connection established")
     
-    # Get Azure configuration
-    endpoint = os.environ.get("AZURE_VOICELIVE_ENDPOINT", "")
-    model = os.environ.get("AZURE_VOICELIVE_MODEL", "")
-    show_transcriptions = os.environ.get("AZURE_VOICELIVE_SHOW_TRANSCRIPTIONS", "True").lower() == "true"
-    
-    # Check for API key (optional - for local development fallback)
-    api_key = os.environ.get("AZURE_VOICELIVE_API_KEY", "")
+    # Azure configuration is read once at import
+    endpoint = AZURE_VOICELIVE_ENDPOINT
+    model = AZURE_VOICELIVE_MODEL
+    show_transcriptions = AZURE_VOICELIVE_SHOW_TRANSCRIPTIONS
     
     if not endpoint:
-        await websocket.send_json({
-            "type": "error",
-            "message": "Server configuration error: Missing endpoint"
-        })
+        await websocket.send_text(MSG_MISSING_ENDPOINT)
         await websocket.close()
         return
     if not model:
-        await websocket.send_json({
-            "type": "error",
-            "message": "Server configuration error: Missing model"
-        })
+        await websocket.send_text(MSG_MISSING_MODEL)
         await websocket.close()
         return
 
-    # Use DefaultAzureCredential (supports managed identity, Azure CLI, environment variables, etc.)
-    # Falls back to API key if explicitly provided
-    if api_key:
-        credential = AzureKeyCredential(api_key)
-        logger.info("Using API key credential")
-    else:
-        credential = DefaultAzureCredential()
-        logger.info("Using DefaultAzureCredential (managed identity)")
-
-    logger.info(f"Connecting to endpoint {endpoint} with model {model}")
+    logger.info("Connecting to endpoint %s with model %s", endpoint, model)
     
     # Wait for initial configuration from client (voice selection, proactive greeting)
     selected_voice_id = DEFAULT_VOICE_ID
     enable_proactive_greeting = False
     try:
         init_data = await asyncio.wait_for(websocket.receive_text(), timeout=10.0)
-        init_message = json.loads(init_data)
-        if init_message.get("type") == "init":
+        init_message = orjson.loads(init_data)
+        # Anything that is not a JSON object cannot be an init message
+        if not isinstance(init_message, dict):
+            logger.warning("Invalid init message, using default settings")
+        elif init_message.get("type") == "init":
             # Voice selection
             if init_message.get("voice_id"):
                 voice_id = init_message["voice_id"]
                 if voice_id in AVAILABLE_VOICES:
                     selected_voice_id = voice_id
-                    logger.info(f"Client selected voice: {selected_voice_id}")
+                    logger.info("Client selected voice: %s", selected_voice_id)
                 else:
-                    logger.warning(f"Unknown voice ID: {voice_id}, using default")
+                    logger.warning("Unknown voice ID: %s, using default", voice_id)
             # Proactive greeting option
             enable_proactive_greeting = init_message.get("proactive_greeting", False)
-            logger.info(f"Proactive greeting enabled: {enable_proactive_greeting}")
+            logger.info("Proactive greeting enabled: %s", enable_proactive_greeting)
     except asyncio.TimeoutError:
         logger.info("No init message received, using default settings")
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.warning("Invalid init message, using default settings")
     
     try:
         # Connect to Azure VoiceLive
         async with connect(
-            endpoint=endpoint,
-            credential=credential,
-            model=model,
+            endpoint=AZURE_VOICELIVE_ENDPOINT,
+            credential=CREDENTIAL,
+            model=AZURE_VOICELIVE_MODEL,
         ) as voicelive_conn:
             
             # Setup session with selected voice
             await setup_session(voicelive_conn, selected_voice_id)
             
             # Send ready signal to client
-            await websocket.send_json({
-                "type": "ready",
-                "message": "Voice assistant ready"
-            })
+            await websocket.send_text(MSG_READY)
             
+            # Outbound frames are buffered and written by a dedicated sender task
+            outbox = ClientOutbox()
+            # Inbound audio is buffered so reading the socket never waits on VoiceLive
+            audio_queue: asyncio.Queue = asyncio.Queue(maxsize=INBOUND_QUEUE_SIZE)
+
             # Create tasks for bidirectional communication
             async def receive_from_client():
-                """Receive audio from client and forward to VoiceLive."""
+                """Receive messages from client and queue audio for VoiceLive."""
                 try:
                     while True:
-                        data = await websocket.receive_text()
-                        message = json.loads(data)
-                        
-                        if message["type"] == "audio":
-                            # Forward audio to VoiceLive
-                            audio_base64 = message["data"]
-                            await voicelive_conn.input_audio_buffer.append(audio=audio_base64)
-                            
-                        elif message["type"] == "stop_audio":
-                            # Client stopped speaking
-                            logger.info("Client stopped speaking")
+                        received = await websocket.receive()
+                        if received["type"] == "websocket.disconnect":
+                            raise WebSocketDisconnect(received.get("code", 1000))
+
+                        # Binary frames carry audio; JSON text frames carry control messages
+                        frame = received.get("bytes")
+                        if frame:
+                            frame_handler = _CLIENT_FRAME_HANDLERS.get(frame[0])
+                            if frame_handler is not None:
+                                # memoryview slice skips the type byte without copying the payload
+                                await frame_handler(memoryview(frame)[1:], audio_queue)
+                            continue
+
+                        data = received.get("text")
+                        if not data:
+                            continue
+                        try:
+                            message = _loads(data)
+                        except _JSONDecodeError:
+                            logger.warning("Dropping malformed client message")
+                            continue
+                        # Valid JSON that is not a typed object is dropped like malformed JSON
+                        if not isinstance(message, dict):
+                            logger.warning("Dropping malformed client message")
+                            continue
+                        handler = _CLIENT_MESSAGE_HANDLERS.get(message.get("type"))
+                        if handler is not None:
+                            await handler(message, audio_queue)
                             
                 except WebSocketDisconnect:
                     logger.info("Client disconnected")
                 except Exception as e:
-                    logger.error(f"Error receiving from client: {e}")
+                    logger.error("Error receiving from client: %s", e)
             
             # Track if proactive greeting has been sent
             proactive_greeting_sent = False
@@ -422,7 +634,7 @@ async def websocket_voice_endpoint(websocket: WebSocket):
                 nonlocal proactive_greeting_sent
                 try:
                     async for event in voicelive_conn:
-                        await handle_voicelive_event(event, voicelive_conn, websocket, show_transcriptions)
+                        await handle_voicelive_event(event, voicelive_conn, outbox, show_transcriptions)
                         
                         # Trigger proactive greeting after session is ready
                         if (event.type == ServerEventType.SESSION_UPDATED 
@@ -435,24 +647,39 @@ async def websocket_voice_endpoint(websocket: WebSocket):
                                     additional_instructions="You say your greeting line."
                                 )
                             except Exception as e:
-                                logger.error(f"Failed to send proactive greeting: {e}")
+                                logger.error("Failed to send proactive greeting: %s", e)
                         
                 except Exception as e:
-                    logger.error(f"Error in VoiceLive event loop: {e}")
+                    logger.error("Error in VoiceLive event loop: %s", e)
             
-            # Run both tasks concurrently
-            await asyncio.gather(
-                receive_from_client(),
-                send_to_client(),
-                return_exceptions=True
-            )
+            # Run all tasks concurrently; once any of them finishes the others are cancelled
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [
+                        tg.create_task(receive_from_client()),
+                        tg.create_task(forward_client_audio(audio_queue, voicelive_conn)),
+                        tg.create_task(send_to_client()),
+                        tg.create_task(outbox.run(websocket)),
+                    ]
+                    for task in tasks:
+                        task.add_done_callback(lambda _: [t.cancel() for t in tasks])
+            except* WebSocketDisconnect:
+                logger.info("Client disconnected")
+            except* Exception as group:
+                for exc in group.exceptions:
+                    logger.error("Connection task failed: %s", exc)
+                # Surface the first failure to the client rather than the group wrapper
+                raise group.exceptions[0]
+            finally:
+                # Results still being submitted would otherwise hit the closed connection
+                await cancel_function_result_tasks(voicelive_conn)
             
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
     except Exception as e:
-        logger.error(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
         try:
-            await websocket.send_json({
+            await send_message(websocket, {
                 "type": "error",
                 "message": str(e)
             })
@@ -465,77 +692,66 @@ async def websocket_voice_endpoint(websocket: WebSocket):
             pass
 
 
-async def setup_session(connection, voice_id: str = DEFAULT_VOICE_ID):
-    """Configure the VoiceLive session with function tools."""
-    logger.info(f"Setting up VoiceLive session with voice: {voice_id}")
-    
-    # Get voice configuration
-    voice_data = AVAILABLE_VOICES.get(voice_id, AVAILABLE_VOICES[DEFAULT_VOICE_ID])
-    voice_config = AzureStandardVoice(name=voice_data["voice"], locale=voice_data["locale"], rate="1.0")
-    
-    # Turn detection configuration
-    turn_detection_config = ServerVad(
-        threshold=0.5,
-        prefix_padding_ms=300,
-        silence_duration_ms=500
-    )
-    
-    # Define function tools
-    function_tools: list[Tool] = [
-        FunctionTool(
-            name="get_current_time",
-            description="Get the current time",
-            parameters={
-                "type": "object",
-                "properties": {
-                    "timezone": {
-                        "type": "string",
-                        "description": "The timezone to get the current time for, e.g., 'UTC', 'local'",
-                    }
-                },
-                "required": [],
+# Turn detection configuration
+TURN_DETECTION_CONFIG = ServerVad(
+    threshold=0.5,
+    prefix_padding_ms=300,
+    silence_duration_ms=500
+)
+
+# Function tools exposed to the assistant
+FUNCTION_TOOLS: list[Tool] = [
+    FunctionTool(
+        name="get_current_time",
+        description="Get the current time",
+        parameters={
+            "type": "object",
+            "properties": {
+                "timezone": {
+                    "type": "string",
+                    "description": "The timezone to get the current time for, e.g., 'UTC', 'local'",
+                }
             },
-        ),
-        FunctionTool(
-            name="get_current_weather",
-            description="Get the current weather in a given location",
-            parameters={
-                "type": "object",
-                "properties": {
-                    "location": {
-                        "type": "string",
-                        "description": "The city and state, e.g., 'San Francisco, CA'",
-                    },
-                    "unit": {
-                        "type": "string",
-                        "enum": ["celsius", "fahrenheit"],
-                        "description": "The unit of temperature to use",
-                    },
+            "required": [],
+        },
+    ),
+    FunctionTool(
+        name="get_current_weather",
+        description="Get the current weather in a given location",
+        parameters={
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "The city and state, e.g., 'San Francisco, CA'",
                 },
-                "required": ["location"],
-            },
-        ),
-        FunctionTool(
-            name="get_mpsv_info",
-            description="Get information about social benefits from MPSV (Ministry of Labour and Social Affairs of Czech Republic)",
-            parameters={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "The query about social benefits, e.g., 'příspěvek na bydlení', 'podpora v nezaměstnanosti'",
-                    }
+                "unit": {
+                    "type": "string",
+                    "enum": ["celsius", "fahrenheit"],
+                    "description": "The unit of temperature to use",
                 },
-                "required": [],
             },
-        ),
-    ]
-    
-    # Session configuration
-    session_config = RequestSession(
-        modalities=[Modality.AUDIO],
+            "required": ["location"],
+        },
+    ),
+    FunctionTool(
+        name="get_mpsv_info",
+        description="Get information about social benefits from MPSV (Ministry of Labour and Social Affairs of Czech Republic)",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The query about social benefits, e.g., 'příspěvek na bydlení', 'podpora v nezaměstnanosti'",
+                }
+            },
+            "required": [],
+        },
+    ),
+]
 
-        instructions="""
+# System prompt for the assistant
+ASSISTANT_INSTRUCTIONS = """
             Jseš Eva, užitečná AI asistentka s přístupem k funkcím.
             Vždy používej funkce, když je to vhodné, abys poskytl přesné a aktuální informace.
 
@@ -558,136 +774,228 @@ async def setup_session(connection, voice_id: str = DEFAULT_VOICE_ID):
 
 
             Mluvíš POUZE česky.
-        """,
-        # instructions="""
-        #     You are a helpful AI assistant with access to functions.
-        #     Use the functions when appropriate to provide accurate, real-time information. 
-        #     If you are asked about the weather, please respond with 'Hmm... let me check the weather for you.' or similar filler and then call the get_current_weather function. 
-        #     If you are asked about the time, please respond with 'I will get the time for you.' or similar filler and then call the get_current_time function. 
-        #     Explain when you're using a function and include the results in your response naturally. You ONLY speak in Czech.
-        # """,
-        # instructions="""
-        #     You are a helpful AI assistant with access to functions.
-        #     Use the functions when appropriate to provide accurate, real-time information. 
-        #     If you are asked about the weather, please respond with summarizing the question to check understanding or similar filler and then call the get_current_weather function. 
-        #     If you are asked about the time, please respond with 'I will get the time for you.' or similar filler and then call the get_current_time function. 
-        #     Explain when you're using a function and include the results in your response naturally.
-        # """,
-        voice=voice_config,
-        input_audio_format=InputAudioFormat.PCM16,
-        output_audio_format=OutputAudioFormat.PCM16,
-        input_audio_echo_cancellation=AudioEchoCancellation(),
-        turn_detection=turn_detection_config,
-        tools=function_tools,
-        tool_choice=ToolChoiceLiteral.AUTO,
-        # input_audio_transcription=AudioInputTranscriptionSettings(model="gpt-4o-transcribe", language="en"),
-        input_audio_transcription=None,
-    )
-    
-    await connection.session.update(session=session_config)
+        """
+
+# ASSISTANT_INSTRUCTIONS = """
+#     You are a helpful AI assistant with access to functions.
+#     Use the functions when appropriate to provide accurate, real-time information. 
+#     If you are asked about the weather, please respond with 'Hmm... let me check the weather for you.' or similar filler and then call the get_current_weather function. 
+#     If you are asked about the time, please respond with 'I will get the time for you.' or similar filler and then call the get_current_time function. 
+#     Explain when you're using a function and include the results in your response naturally. You ONLY speak in Czech.
+# """
+# ASSISTANT_INSTRUCTIONS = """
+#     You are a helpful AI assistant with access to functions.
+#     Use the functions when appropriate to provide accurate, real-time information. 
+#     If you are asked about the weather, please respond with summarizing the question to check understanding or similar filler and then call the get_current_weather function. 
+#     If you are asked about the time, please respond with 'I will get the time for you.' or similar filler and then call the get_current_time function. 
+#     Explain when you're using a function and include the results in your response naturally.
+# """
+
+# RequestSession per voice ID; sessions are built on first use and reused across connections
+_SESSION_CACHE: Dict[str, RequestSession] = {}
+
+
+def get_session_config(voice_id: str) -> RequestSession:
+    """Get the session configuration for a voice, building it on first use."""
+    if voice_id not in AVAILABLE_VOICES:
+        voice_id = DEFAULT_VOICE_ID
+    session_config = _SESSION_CACHE.get(voice_id)
+    if session_config is None:
+        session_config = RequestSession(
+            modalities=[Modality.AUDIO],
+            instructions=ASSISTANT_INSTRUCTIONS,
+            voice=VOICE_CONFIGS[voice_id],
+            input_audio_format=InputAudioFormat.PCM16,
+            output_audio_format=OutputAudioFormat.PCM16,
+            input_audio_echo_cancellation=AudioEchoCancellation(),
+            turn_detection=TURN_DETECTION_CONFIG,
+            tools=FUNCTION_TOOLS,
+            tool_choice=ToolChoiceLiteral.AUTO,
+            # input_audio_transcription=AudioInputTranscriptionSettings(model="gpt-4o-transcribe", language="en"),
+            input_audio_transcription=None,
+        )
+        _SESSION_CACHE[voice_id] = session_config
+    return session_config
+
+
+async def setup_session(connection, voice_id: str = DEFAULT_VOICE_ID):
+    """Configure the VoiceLive session with function tools."""
+    logger.info("Setting up VoiceLive session with voice: %s", voice_id)
+    await connection.session.update(session=get_session_config(voice_id))
     logger.info("VoiceLive session configured")
 
 
-async def handle_voicelive_event(event, voicelive_conn, websocket: WebSocket, show_transcriptions: bool = True):
-    """Handle events from VoiceLive and send appropriate messages to client."""
-    
-    if event.type == ServerEventType.SESSION_UPDATED:
-        logger.info(f"Session ready: {event.session.id}")
-        await websocket.send_json({
-            "type": "session_ready",
-            "session_id": event.session.id
-        })
-    
-    elif event.type == ServerEventType.INPUT_AUDIO_BUFFER_SPEECH_STARTED:
-        logger.info("User started speaking")
-        await websocket.send_json({
-            "type": "user_started_speaking"
-        })
-        # Cancel any ongoing response
-        try:
-            await voicelive_conn.response.cancel()
-        except:
-            pass
-    
-    elif event.type == ServerEventType.INPUT_AUDIO_BUFFER_SPEECH_STOPPED:
-        logger.info("User stopped speaking")
-        await websocket.send_json({
-            "type": "user_stopped_speaking"
-        })
-    
-    elif event.type == ServerEventType.RESPONSE_CREATED:
-        logger.info("Assistant response created")
-        await websocket.send_json({
-            "type": "assistant_response_started"
-        })
-    
-    elif event.type == ServerEventType.RESPONSE_AUDIO_DELTA:
-        # Stream audio back to client
-        audio_base64 = base64.b64encode(event.delta).decode("utf-8")
-        await websocket.send_json({
-            "type": "audio",
-            "data": audio_base64
-        })
-    
-    elif event.type == ServerEventType.RESPONSE_AUDIO_DONE:
-        logger.info("Assistant finished speaking")
-        await websocket.send_json({
-            "type": "assistant_response_ended"
-        })
+def _put_dropping_oldest(queue: asyncio.Queue, item: Any) -> None:
+    """Put an item on a bounded queue, discarding the oldest item if the queue is full."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
 
-    elif event.type == ServerEventType.RESPONSE_DONE:
-        logger.info("Response complete")
-        await websocket.send_json({
-            "type": "response_complete"
-        })
-    
-    elif event.type == ServerEventType.CONVERSATION_ITEM_INPUT_AUDIO_TRANSCRIPTION_COMPLETED:
-        transcript = getattr(event, "transcript", "")
-        logger.info(f"User said: {transcript}")
-        if show_transcriptions:
-            await websocket.send_json({
-                "type": "user_transcript",
-                "text": transcript
-            })
-    
-    elif event.type == ServerEventType.RESPONSE_AUDIO_TRANSCRIPT_DONE:
-        transcript = getattr(event, "transcript", "")
-        logger.info(f"Assistant said: {transcript}")
-        if show_transcriptions:
-            await websocket.send_json({
-                "type": "assistant_transcript",
-                "text": transcript
-            })
-    
-    elif event.type == ServerEventType.CONVERSATION_ITEM_CREATED:
-        # Handle function calls
-        if event.item.type == ItemType.FUNCTION_CALL:
-            await handle_function_call(event, voicelive_conn, websocket, show_transcriptions)
-    
-    elif event.type == ServerEventType.ERROR:
-        logger.error(f"VoiceLive error: {event.error.message}")
-        await websocket.send_json({
-            "type": "error",
-            "message": event.error.message
-        })
+
+async def forward_client_audio(audio_queue: asyncio.Queue, voicelive_conn):
+    """Forward queued client audio to VoiceLive until cancelled."""
+    while True:
+        audio_base64 = await audio_queue.get()
+        # The SDK accepts base64 directly, so no decode is needed
+        await voicelive_conn.input_audio_buffer.append(audio=audio_base64)
 
 
-async def handle_function_call(conversation_created_event, voicelive_conn, websocket: WebSocket, show_transcriptions: bool = True):
-    """Handle function call from the assistant."""
-    if not isinstance(conversation_created_event, ServerEventConversationItemCreated):
+async def _on_client_audio(message: Mapping[str, Any], audio_queue: asyncio.Queue):
+    audio_base64 = message.get("data")
+    # Reject empty or oversized frames before they reach VoiceLive
+    if not audio_base64 or len(audio_base64) > MAX_CLIENT_AUDIO_B64_LEN:
+        logger.warning("Dropping client audio frame of invalid size")
         return
-    
-    if not isinstance(conversation_created_event.item, ResponseFunctionCallItem):
+    _put_dropping_oldest(audio_queue, audio_base64)
+
+
+async def _on_client_stop_audio(message: Mapping[str, Any], audio_queue: asyncio.Queue):
+    # Client stopped speaking
+    logger.info("Client stopped speaking")
+
+
+async def _on_client_audio_frame(payload: memoryview, audio_queue: asyncio.Queue):
+    # Raw PCM16 from a binary frame; the SDK expects base64, so encode once here
+    if not payload or len(payload) > MAX_CLIENT_AUDIO_BYTES:
+        logger.warning("Dropping client audio frame of invalid size")
         return
-    
+    _put_dropping_oldest(audio_queue, binascii.b2a_base64(payload, newline=False).decode("ascii"))
+
+
+# Bound once for the per-frame receive loop
+_loads = orjson.loads
+_JSONDecodeError = orjson.JSONDecodeError
+
+# Client message type -> handler
+_CLIENT_MESSAGE_HANDLERS: Dict[str, Callable[..., Awaitable[None]]] = {
+    "audio": _on_client_audio,
+    "stop_audio": _on_client_stop_audio,
+}
+
+# Client binary frame type (first byte) -> handler, called with the rest of the frame
+_CLIENT_FRAME_HANDLERS: Dict[int, Callable[..., Awaitable[None]]] = {
+    AUDIO_FRAME: _on_client_audio_frame,
+}
+
+
+async def _on_session_updated(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    logger.info("Session ready: %s", event.session.id)
+    await send_message(outbox, {
+        "type": "session_ready",
+        "session_id": event.session.id
+    })
+
+
+async def _on_speech_started(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    logger.info("User started speaking")
+    await outbox.send_text(MSG_USER_STARTED_SPEAKING)
+    # Cancel any ongoing response
+    try:
+        await voicelive_conn.response.cancel()
+    except:
+        pass
+
+
+async def _on_speech_stopped(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    logger.info("User stopped speaking")
+    await outbox.send_text(MSG_USER_STOPPED_SPEAKING)
+
+
+async def _on_response_created(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    logger.info("Assistant response created")
+    await outbox.send_text(MSG_ASSISTANT_RESPONSE_STARTED)
+
+
+async def _on_audio_delta(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    # Stream raw PCM16 back to client as a binary frame (no base64 or JSON)
+    await outbox.send_bytes(AUDIO_FRAME_PREFIX + event.delta, droppable=True)
+
+
+async def _on_audio_done(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    logger.info("Assistant finished speaking")
+    await outbox.send_text(MSG_ASSISTANT_RESPONSE_ENDED)
+
+
+async def _on_response_done(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    logger.info("Response complete")
+    await outbox.send_text(MSG_RESPONSE_COMPLETE)
+
+
+async def _on_user_transcript(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    transcript = event.transcript or ""
+    logger.info("User said: %s", transcript)
+    if show_transcriptions:
+        await send_message(outbox, {
+            "type": "user_transcript",
+            "text": transcript
+        })
+
+
+async def _on_assistant_transcript(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    transcript = event.transcript or ""
+    logger.info("Assistant said: %s", transcript)
+    if show_transcriptions:
+        await send_message(outbox, {
+            "type": "assistant_transcript",
+            "text": transcript
+        })
+
+
+async def _on_conversation_item_created(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    # Handle function calls; a FUNCTION_CALL item is always a ResponseFunctionCallItem
+    if event.item.type == ItemType.FUNCTION_CALL:
+        await handle_function_call(event, voicelive_conn, outbox, show_transcriptions)
+
+
+async def _on_error(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool):
+    logger.error("VoiceLive error: %s", event.error.message)
+    await send_message(outbox, {
+        "type": "error",
+        "message": event.error.message
+    })
+
+
+# VoiceLive event type -> handler, so each event costs one dict lookup
+_EVENT_HANDLERS: Dict[Any, Callable[..., Awaitable[None]]] = {
+    ServerEventType.SESSION_UPDATED: _on_session_updated,
+    ServerEventType.INPUT_AUDIO_BUFFER_SPEECH_STARTED: _on_speech_started,
+    ServerEventType.INPUT_AUDIO_BUFFER_SPEECH_STOPPED: _on_speech_stopped,
+    ServerEventType.RESPONSE_CREATED: _on_response_created,
+    ServerEventType.RESPONSE_AUDIO_DELTA: _on_audio_delta,
+    ServerEventType.RESPONSE_AUDIO_DONE: _on_audio_done,
+    ServerEventType.RESPONSE_DONE: _on_response_done,
+    ServerEventType.CONVERSATION_ITEM_INPUT_AUDIO_TRANSCRIPTION_COMPLETED: _on_user_transcript,
+    ServerEventType.RESPONSE_AUDIO_TRANSCRIPT_DONE: _on_assistant_transcript,
+    ServerEventType.CONVERSATION_ITEM_CREATED: _on_conversation_item_created,
+    ServerEventType.ERROR: _on_error,
+}
+
+
+async def handle_voicelive_event(event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool = True):
+    """Handle events from VoiceLive and send appropriate messages to client."""
+    handler = _EVENT_HANDLERS.get(event.type)
+    if handler is not None:
+        await handler(event, voicelive_conn, outbox, show_transcriptions)
+
+
+# Event types awaited during a function call, built once instead of per call
+_ARGUMENTS_DONE_EVENTS = frozenset({ServerEventType.RESPONSE_FUNCTION_CALL_ARGUMENTS_DONE})
+_RESPONSE_DONE_EVENTS = frozenset({ServerEventType.RESPONSE_DONE})
+
+
+async def handle_function_call(conversation_created_event, voicelive_conn, outbox: ClientOutbox, show_transcriptions: bool = True):
+    """Handle function call from the assistant.
+
+    Called for CONVERSATION_ITEM_CREATED events whose item is a function call.
+    """
     function_call_item = conversation_created_event.item
     function_name = function_call_item.name
     call_id = function_call_item.call_id
     previous_item_id = function_call_item.id
     
-    logger.info(f"Function call: {function_name} (call_id: {call_id})")
+    logger.info("Function call: %s (call_id: %s)", function_name, call_id)
     
-    await websocket.send_json({
+    await send_message(outbox, {
         "type": "function_call",
         "function": function_name
     })
@@ -695,11 +1003,11 @@ async def handle_function_call(conversation_created_event, voicelive_conn, webso
     try:
         # Wait for arguments to be complete
         async def forward_event(evt):
-            await handle_voicelive_event(evt, voicelive_conn, websocket, show_transcriptions)
+            await handle_voicelive_event(evt, voicelive_conn, outbox, show_transcriptions)
         
         function_done = await wait_for_event(
             voicelive_conn,
-            {ServerEventType.RESPONSE_FUNCTION_CALL_ARGUMENTS_DONE},
+            _ARGUMENTS_DONE_EVENTS,
             on_unhandled=forward_event,
         )
         
@@ -710,50 +1018,93 @@ async def handle_function_call(conversation_created_event, voicelive_conn, webso
             return
         
         arguments = function_done.arguments
-        logger.info(f"Function arguments: {arguments}")
-        
+        logger.info("Function arguments: %s", arguments)
+
+        if function_name not in AVAILABLE_FUNCTIONS:
+            logger.error("Unknown function: %s", function_name)
+            return
+
+        # Start the function now so it runs while the rest of the response is streamed
+        function_task = asyncio.create_task(call_function(function_name, arguments))
+
         # Wait for response to be done
-        await wait_for_event(
-            voicelive_conn,
-            {ServerEventType.RESPONSE_DONE},
-            on_unhandled=forward_event,
-        )
-        
-        # Execute function if available
-        if function_name in AVAILABLE_FUNCTIONS:
-            result = AVAILABLE_FUNCTIONS[function_name](arguments)
-            logger.info(f"Function result: {result}")
-            
-            # Send result back to VoiceLive
-            function_output = FunctionCallOutputItem(
-                call_id=call_id,
-                output=json.dumps(result)
-            )
-            
-            await voicelive_conn.conversation.item.create(
-                previous_item_id=previous_item_id,
-                item=function_output
+        try:
+            await wait_for_event(
+                voicelive_conn,
+                _RESPONSE_DONE_EVENTS,
+                on_unhandled=forward_event,
             )
-            
-            # Create new response to process the function result
-            await voicelive_conn.response.create()
-            
-            await websocket.send_json({
-                "type": "function_result",
-                "function": function_name,
-                "result": result
-            })
-        else:
-            logger.error(f"Unknown function: {function_name}")
+        except BaseException:
+            function_task.cancel()
+            raise
+
+        # Submit the result in the background so this session keeps processing events
+        submit_task = asyncio.create_task(
+            submit_function_result(function_name, function_task, call_id, previous_item_id, voicelive_conn, outbox)
+        )
+        session_tasks = _function_result_tasks.setdefault(voicelive_conn, set())
+        session_tasks.add(submit_task)
+        submit_task.add_done_callback(session_tasks.discard)
     
     except asyncio.TimeoutError:
-        logger.error(f"Timeout waiting for function {function_name}")
+        logger.error("Timeout waiting for function %s", function_name)
     except Exception as e:
-        logger.error(f"Error executing function {function_name}: {e}")
+        logger.error("Error executing function %s: %s", function_name, e)
 
 
+# Background tasks submitting function results, per VoiceLive connection (one per session);
+# referenced here so they are not garbage collected, and cancelled when their session ends
+_function_result_tasks: Dict[Any, set[asyncio.Task]] = {}
+
+
+async def cancel_function_result_tasks(voicelive_conn) -> None:
+    """Cancel a session's pending function result submissions before its connection closes."""
+    tasks = _function_result_tasks.pop(voicelive_conn, set())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def submit_function_result(
+    function_name: str,
+    function_task: "asyncio.Task[Tuple[Mapping[str, Any], bool]]",
+    call_id: str,
+    previous_item_id: str,
+    voicelive_conn,
+    outbox: ClientOutbox,
+):
+    """Wait for a running function call and send its result to VoiceLive and the client."""
+    try:
+        result, cache_hit = await function_task
+        logger.info("Function result (cache hit: %s): %s", cache_hit, result)
+
+        # Send result back to VoiceLive
+        function_output = FunctionCallOutputItem(
+            call_id=call_id,
+            output=orjson.dumps(result).decode("utf-8")
+        )
+
+        await voicelive_conn.conversation.item.create(
+            previous_item_id=previous_item_id,
+            item=function_output
+        )
+
+        # Create new response to process the function result
+        await voicelive_conn.response.create()
+
+        await send_message(outbox, {
+            "type": "function_result",
+            "function": function_name,
+            "result": result,
+            "cache_hit": cache_hit
+        })
+    except Exception as e:
+        logger.error("Error executing function %s: %s", function_name, e)
+
 if __name__ == "__main__":
     import uvicorn
     
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # uvloop/httptools ship with uvicorn[standard]; pin them so a missing extra fails loudly
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools", ws="websockets")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the backend package importable as ``app`` wherever pytest is started from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
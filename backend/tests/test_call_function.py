@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app import main
+
+
+@pytest.fixture(autouse=True)
+def no_simulated_latency(monkeypatch):
+    """Skip the simulated API latency and start every test with an empty result cache."""
+    monkeypatch.setattr(main, "WEATHER_API_DELAY_S", 0)
+    monkeypatch.setattr(main, "MPSV_API_DELAY_S", 0)
+    main._function_result_cache.clear()
+
+
+@pytest.mark.parametrize("arguments", ["", None])
+def test_cached_function_with_empty_arguments(arguments):
+    result, cached = asyncio.run(main.call_function("get_mpsv_info", arguments))
+    assert result["query"] == ""
+    assert not cached
+
+    result, cached = asyncio.run(main.call_function("get_mpsv_info", arguments))
+    assert result["query"] == ""
+    assert cached
+
+
+@pytest.mark.parametrize(
+    ("arguments", "error"),
+    [
+        (None, "No arguments provided"),
+        ("", "Invalid arguments"),
+        ("not json", "Invalid arguments"),
+        ("[1, 2]", "Invalid arguments"),
+    ],
+)
+def test_weather_with_missing_or_invalid_arguments(arguments, error):
+    result, cached = asyncio.run(main.call_function("get_current_weather", arguments))
+    assert result == {"error": error}
+    assert not cached
+    assert not main._function_result_cache
+
+
+@pytest.mark.parametrize(
+    ("arguments", "expected"),
+    [
+        ({"location": "Seattle"}, {"location": "Seattle"}),
+        ('{"location": "Seattle"}', {"location": "Seattle"}),
+        (b'{"location": "Seattle"}', {"location": "Seattle"}),
+        (None, {}),
+        ("", {}),
+        (b"", {}),
+    ],
+)
+def test_coerce_args(arguments, expected):
+    assert main._coerce_args(arguments) == expected
+
+
+@pytest.mark.parametrize("arguments", ["not json", "[1, 2]", '"text"', b"null"])
+def test_coerce_args_rejects_non_objects(arguments):
+    assert main._coerce_args(arguments) is None
+
+
+def test_coerce_args_returns_mappings_unchanged():
+    arguments = {"query": "benefits"}
+    assert main._coerce_args(arguments) is arguments
@@ -0,0 +1,43 @@
+import asyncio
+import base64
+
+from app import main
+
+
+def dispatch(frame, audio_queue):
+    """Route a binary client frame the way the WebSocket receive loop does."""
+    handler = main._CLIENT_FRAME_HANDLERS.get(frame[0])
+    if handler is not None:
+        asyncio.run(handler(memoryview(frame)[1:], audio_queue))
+    return handler
+
+
+def test_audio_frame_is_queued_as_base64():
+    audio_queue = asyncio.Queue(maxsize=main.INBOUND_QUEUE_SIZE)
+    pcm = bytes(range(256)) * 4
+
+    assert dispatch(main.AUDIO_FRAME_PREFIX + pcm, audio_queue) is not None
+    assert base64.b64decode(audio_queue.get_nowait()) == pcm
+
+
+def test_unknown_frame_type_is_ignored():
+    audio_queue = asyncio.Queue(maxsize=main.INBOUND_QUEUE_SIZE)
+
+    assert dispatch(b"\x7fpayload", audio_queue) is None
+    assert audio_queue.empty()
+
+
+def test_empty_and_oversized_audio_frames_are_dropped():
+    audio_queue = asyncio.Queue(maxsize=main.INBOUND_QUEUE_SIZE)
+
+    dispatch(main.AUDIO_FRAME_PREFIX, audio_queue)
+    dispatch(main.AUDIO_FRAME_PREFIX + bytes(main.MAX_CLIENT_AUDIO_BYTES + 2), audio_queue)
+    assert audio_queue.empty()
+
+
+def test_full_inbound_queue_drops_the_oldest_frame():
+    audio_queue = asyncio.Queue(maxsize=2)
+
+    for payload in (b"\x00\x01", b"\x00\x02", b"\x00\x03"):
+        dispatch(main.AUDIO_FRAME_PREFIX + payload, audio_queue)
+    assert [base64.b64decode(audio_queue.get_nowait()) for _ in range(2)] == [b"\x00\x02", b"\x00\x03"]
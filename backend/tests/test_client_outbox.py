@@ -0,0 +1,81 @@
+import asyncio
+
+import orjson
+
+from app import main
+
+
+class RecordingWebSocket:
+    """Collects the frames written by ClientOutbox.run."""
+
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, data):
+        self.frames.append(data)
+
+    async def send_bytes(self, data):
+        self.frames.append(data)
+
+
+async def drain(outbox):
+    """Run the outbox sender until it has written everything queued, then stop it."""
+    websocket = RecordingWebSocket()
+    task = asyncio.create_task(outbox.run(websocket))
+    for _ in range(5):
+        await asyncio.sleep(0)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return websocket.frames
+
+
+def test_full_outbox_drops_oldest_audio_and_keeps_control_messages():
+    async def scenario():
+        outbox = main.ClientOutbox(maxsize=3)
+        await outbox.send_text('{"type":"ready"}')
+        await outbox.send_bytes(b"\x01first", droppable=True)
+        await outbox.send_bytes(b"\x01second", droppable=True)
+        await outbox.send_bytes(b"\x01third", droppable=True)
+        return await drain(outbox)
+
+    assert asyncio.run(scenario()) == ['{"type":"ready"}', b"\x01second", b"\x01third"]
+
+
+def test_full_outbox_without_audio_keeps_every_frame():
+    async def scenario():
+        outbox = main.ClientOutbox(maxsize=1)
+        await outbox.send_text('{"type":"a"}')
+        await outbox.send_text('{"type":"b"}')
+        await outbox.send_bytes(b"\x01audio")
+        return await drain(outbox)
+
+    assert asyncio.run(scenario()) == ['{"type":"batch","messages":[{"type":"a"},{"type":"b"}]}', b"\x01audio"]
+
+
+def test_queued_text_messages_are_coalesced_into_one_batch():
+    async def scenario():
+        outbox = main.ClientOutbox()
+        for index in range(main.MAX_BATCH_MESSAGES + 1):
+            await outbox.send_text(orjson.dumps({"type": "transcript", "index": index}).decode("utf-8"))
+        return await drain(outbox)
+
+    frames = asyncio.run(scenario())
+    assert len(frames) == 2
+    batch = orjson.loads(frames[0])
+    assert batch["type"] == "batch"
+    assert [message["index"] for message in batch["messages"]] == list(range(main.MAX_BATCH_MESSAGES))
+    assert orjson.loads(frames[1]) == {"type": "transcript", "index": main.MAX_BATCH_MESSAGES}
+
+
+def test_single_text_message_is_sent_as_is():
+    async def scenario():
+        outbox = main.ClientOutbox()
+        await outbox.send_text('{"type":"ready"}')
+        await outbox.send_bytes(b"\x01audio")
+        await outbox.send_text('{"type":"error"}')
+        return await drain(outbox)
+
+    assert asyncio.run(scenario()) == ['{"type":"ready"}', b"\x01audio", '{"type":"error"}']
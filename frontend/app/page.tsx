@@ -10,6 +10,9 @@ import ProactiveToggle from "@/components/ProactiveToggle";
 
 type AssistantState = "idle" | "listening" | "processing" | "speaking";
 
+// Binary WebSocket frame types (first byte of each binary frame, in both directions)
+const AUDIO_FRAME = 0x01;
+
 export default function Home() {
   const [state, setState] = useState<AssistantState>("idle");
   const [isConnected, setIsConnected] = useState(false);
@@ -57,6 +60,7 @@ export default function Home() {
       const ws = new WebSocket(
         process.env.NEXT_PUBLIC_WS_URL || "ws://localhost:8000/ws/voice"
       );
+      ws.binaryType = "arraybuffer";
       wsRef.current = ws;
 
       ws.onopen = () => {
@@ -73,7 +77,19 @@ export default function Home() {
       };
 
       ws.onmessage = (event) => {
+        // Binary frames: first byte is the frame type, the rest is the payload
+        if (event.data instanceof ArrayBuffer) {
+          if (new Uint8Array(event.data)[0] === AUDIO_FRAME) {
+            playPcm16(event.data.slice(1));
+          }
+          return;
+        }
         const message = JSON.parse(event.data);
+        // The server coalesces messages that were queued together into one batch frame
+        if (message.type === "batch") {
+          message.messages.forEach(handleWebSocketMessage);
+          return;
+        }
         handleWebSocketMessage(message);
       };
 
@@ -101,7 +117,6 @@ export default function Home() {
   const handleWebSocketMessage = (message: {
     type: string;
     text?: string;
-    data?: string;
     function?: string;
     message?: string;
     [key: string]: unknown;
@@ -136,13 +151,6 @@ export default function Home() {
         setState("idle");
         break;
 
-      case "audio":
-        // Queue audio for playback
-        if (message.data) {
-          playAudio(message.data);
-        }
-        break;
-
       case "user_transcript":
         setTranscript(message.text || "");
         break;
@@ -190,37 +198,24 @@ export default function Home() {
         pcm16[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
       }
 
-      // Convert to base64 and send
-      const base64 = btoa(
-        String.fromCharCode.apply(null, Array.from(new Uint8Array(pcm16.buffer)))
-      );
-
-      wsRef.current.send(
-        JSON.stringify({
-          type: "audio",
-          data: base64,
-        })
-      );
+      // Send as a binary frame: type byte followed by raw PCM16
+      const frame = new Uint8Array(1 + pcm16.byteLength);
+      frame[0] = AUDIO_FRAME;
+      frame.set(new Uint8Array(pcm16.buffer), 1);
+      wsRef.current.send(frame);
     };
 
     source.connect(processor);
     processor.connect(audioContext.destination);
   };
 
-  // Play audio received from server
-  const playAudio = async (base64Audio: string) => {
+  // Play raw PCM16 audio received from server
+  const playPcm16 = (buffer: ArrayBuffer) => {
     if (!audioContextRef.current) return;
 
     try {
-      // Decode base64 to binary
-      const binaryString = atob(base64Audio);
-      const bytes = new Uint8Array(binaryString.length);
-      for (let i = 0; i < binaryString.length; i++) {
-        bytes[i] = binaryString.charCodeAt(i);
-      }
-
       // Convert PCM16 to Float32
-      const pcm16 = new Int16Array(bytes.buffer);
+      const pcm16 = new Int16Array(buffer);
       const float32 = new Float32Array(pcm16.length);
       for (let i = 0; i < pcm16.length; i++) {
         float32[i] = pcm16[i] / (pcm16[i] < 0 ? 0x8000 : 0x7fff);
@@ -3,21 +3,49 @@
 Text-to-Speech Synthesis Script using Azure Speech Service.
 
 Reads a text file where each line represents an utterance to synthesize.
-Generates WAV files for each combination of voice model and speech rate.
+Generates WAV (or, with --format mp3, MP3) files for each combination of voice
+model and speech rate.
+WAV files are 24 kHz, 16-bit mono PCM: the service streams raw PCM
+(Raw24Khz16BitMonoPcm) and the WAV header is written locally, instead of the
+SDK's default RIFF output format. MP3 files are 24 kHz mono at 48 kbit/s.
 Lines starting with '#' are skipped (comments).
+Synthesized audio is cached in tts-out/.cache by SSML hash, so unchanged lines
+are not sent to the service again.
 
 Usage:
-    python synthetize.py <input_file.txt>
+    python synthetize.py <input_file.txt> [--force] [--format {wav,mp3}] [--jobs N] [--dry-run]
+
+Files that already exist in the output directory are skipped, and cached audio is
+reused, unless --force is given; --force sends every line to the service again.
+--dry-run lists the files that would be generated (and which of them the cache
+already covers) without calling the service; it needs no credentials or endpoint.
 
 Environment variables required:
     SPEECH_KEY - Azure Speech Service subscription key
     ENDPOINT - Azure Speech Service endpoint (e.g., https://YourServiceRegion.api.cognitive.microsoft.com)
+
+To spread load over several Speech resources (each has its own concurrency limit),
+set ENDPOINTS and SPEECH_KEYS to comma-separated lists instead; jobs are assigned
+to them round-robin.
 """
 
 import os
+import re
 import sys
+import time
+import shutil
+import sqlite3
+import hashlib
+import functools
+import asyncio
 import argparse
+import concurrent.futures
+import queue
+import random
+import threading
+import wave
 import azure.cognitiveservices.speech as speechsdk
+from typing import Iterable, Iterator, Optional, Sequence
 from azure.identity import DefaultAzureCredential
 from dotenv import load_dotenv
 load_dotenv(override=True)
@@ -39,16 +67,76 @@ OUTPUT_DIR = "tts-out"
 # Locale for speech synthesis
 LOCALE = "cs-CZ"
 
+# Number of syntheses run concurrently (each call is a network round-trip to Azure)
+MAX_WORKERS = 8
+
+# Synthesis output per file extension. WAV is streamed from the service as raw 16-bit mono
+# PCM and wrapped in a WAV container locally; MP3 is ~8x fewer bytes per second of audio
+# and is written as received
+OUTPUT_FORMATS = {
+    ".wav": speechsdk.SpeechSynthesisOutputFormat.Raw24Khz16BitMonoPcm,
+    ".mp3": speechsdk.SpeechSynthesisOutputFormat.Audio24Khz48KBitRateMonoMp3,
+}
+SAMPLE_RATE = 24000
+
+# Size of a WAV header; smaller files hold no audio (e.g. from a failed run)
+WAV_HEADER_BYTES = 44
+
+# Bytes read from the audio stream per chunk (~0.5 s of audio)
+STREAM_CHUNK_BYTES = 24000
+
+# Attempts per file when the service throttles or fails transiently, with exponential backoff
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY_S = 1.0
+RETRY_MAX_DELAY_S = 60.0
+RETRYABLE_ERROR_CODES = frozenset({
+    speechsdk.CancellationErrorCode.TooManyRequests,
+    speechsdk.CancellationErrorCode.ConnectionFailure,
+    speechsdk.CancellationErrorCode.ServiceTimeout,
+    speechsdk.CancellationErrorCode.ServiceUnavailable,
+    speechsdk.CancellationErrorCode.ServiceError,
+})
+
+# Content-addressed cache of synthesized audio, keyed by the SHA-256 of the SSML
+CACHE_DIR = os.path.join(OUTPUT_DIR, ".cache")
+CACHE_INDEX = os.path.join(CACHE_DIR, "index.db")
+
+# Least recently used cache entries are evicted once the cache grows past this size
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+CACHE_EVICT_BATCH = 256
+
+# Cache index: one row per cached file with its size, last use (atime) and hit count
+_cache_index: Optional[sqlite3.Connection] = None
+_cache_lock = threading.Lock()
+
+# Finished outputs waiting to be copied into the cache by the cache writer thread
+_cache_writes: queue.Queue = queue.Queue()
+_cache_writer: Optional[threading.Thread] = None
+
+# Per-worker-thread state (the thread's SpeechSynthesizer for each endpoint)
+_thread_state = threading.local()
+
+
+# Characters that are not allowed in filenames, mapped to "_"
+_FILENAME_TRANSLATION = str.maketrans({":": "_", "/": "_", "\\": "_"})
+
+# Characters that must be escaped in SSML text, and a single-pass pattern matching them
+_XML_ESCAPE = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&apos;"}
+_XML_RE = re.compile("[" + "".join(_XML_ESCAPE) + "]")
+
 
 def sanitize_filename(name: str) -> str:
     """Sanitize a string to be used as a filename."""
-    return name.replace(":", "_").replace("/", "_").replace("\\", "_")
+    return name.translate(_FILENAME_TRANSLATION)
 
 
+@functools.lru_cache(maxsize=4096)
 def create_ssml(text: str, voice_name: str, rate: float) -> str:
     """
     Create SSML markup for speech synthesis with specified voice and rate.
     
+    Memoized, since the same (text, voice, rate) is requested again for repeated lines.
+    
     Args:
         text: The text to synthesize
         voice_name: The voice model name
@@ -60,6 +148,9 @@ def create_ssml(text: str, voice_name: str, rate: float) -> str:
     # Rate in SSML can be specified as percentage (e.g., "110%" for 1.1x)
     rate_percent = int(rate * 100)
     
+    # Unescaped markup characters make the service reject the whole document
+    text = _XML_RE.sub(lambda m: _XML_ESCAPE[m.group()], text)
+    
     ssml = f"""<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="en-US">
     <voice name="{voice_name}">
         <lang xml:lang="{LOCALE}">
@@ -79,74 +170,342 @@ def create_ssml(text: str, voice_name: str, rate: float) -> str:
     return ssml
 
 
+def get_synthesizer(speech_config: speechsdk.SpeechConfig) -> speechsdk.SpeechSynthesizer:
+    """
+    Return the calling thread's SpeechSynthesizer for speech_config, creating it on first use.
+    
+    Reusing a synthesizer keeps its service connection open across utterances
+    instead of paying the connection setup for every file.
+    """
+    synthesizers = getattr(_thread_state, "synthesizers", None)
+    if synthesizers is None:
+        synthesizers = _thread_state.synthesizers = {}
+    synthesizer = synthesizers.get(id(speech_config))
+    if synthesizer is None:
+        # No audio output config: audio is read from the result and written here
+        synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+        synthesizers[id(speech_config)] = synthesizer
+    return synthesizer
+
+
 def synthesize_text(
     speech_config: speechsdk.SpeechConfig,
     text: str,
     voice_name: str,
     rate: float,
-    output_path: str
+    output_path: str,
+    use_cache: bool = True
 ) -> bool:
     """
-    Synthesize text to speech and save as WAV file.
+    Synthesize text to speech and save it in the format given by output_path's extension.
     
     Args:
         speech_config: Azure Speech configuration
         text: The text to synthesize
         voice_name: The voice model name
         rate: The speech rate
-        output_path: Path to save the WAV file
+        output_path: Path to save the audio file (.wav or .mp3)
+        use_cache: Serve previously cached audio; if False, always call the service
+            (the new audio still replaces the cache entry)
     
     Returns:
         True if synthesis was successful, False otherwise
     """
-    # Configure audio output to file
-    audio_config = speechsdk.audio.AudioOutputConfig(filename=output_path)
-    
-    # Create synthesizer
-    speech_synthesizer = speechsdk.SpeechSynthesizer(
-        speech_config=speech_config,
-        audio_config=audio_config
-    )
-    
     # Create SSML with rate
     ssml = create_ssml(text, voice_name, rate)
     
-    # Synthesize using SSML
-    result = speech_synthesizer.speak_ssml_async(ssml).get()
-    
-    if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-        print(f"  ✓ Saved: {output_path}")
+    # The SSML covers text, voice, rate and locale, so identical SSML (in the same
+    # output format) means identical audio
+    extension = os.path.splitext(output_path)[1]
+    key = cache_key(ssml, extension)
+    cached_path = os.path.join(CACHE_DIR, f"{key}{extension}")
+    if use_cache and os.path.exists(cached_path):
+        copy_into_place(cached_path, output_path)
+        record_cache_entry(key, cached_path, text, voice_name, rate)
+        print(f"  ✓ Cached: {output_path}")
         return True
+    
+    speech_synthesizer = get_synthesizer(speech_config)
+    for attempt in range(MAX_ATTEMPTS):
+        succeeded, cancellation_details = stream_to_file(speech_synthesizer, ssml, output_path)
+        if succeeded:
+            # The cache copy is left to the writer thread so this worker can take the next job
+            _cache_writes.put((output_path, cached_path, key, text, voice_name, rate))
+            print(f"  ✓ Saved: {output_path}")
+            return True
+        if cancellation_details is None:
+            return False
+        
+        # Retry throttling and transient service errors with jittered exponential backoff
+        if (cancellation_details.reason != speechsdk.CancellationReason.Error
+                or cancellation_details.error_code not in RETRYABLE_ERROR_CODES
+                or attempt == MAX_ATTEMPTS - 1):
+            break
+        delay = min(RETRY_MAX_DELAY_S, RETRY_BASE_DELAY_S * 2 ** attempt) + random.random()
+        print(f"  … Retrying {output_path} in {delay:.1f}s ({cancellation_details.error_code})")
+        time.sleep(delay)
+    
+    print(f"  ✗ Synthesis canceled for {output_path}: {cancellation_details.reason}")
+    if cancellation_details.reason == speechsdk.CancellationReason.Error:
+        if cancellation_details.error_details:
+            print(f"    Error details: {cancellation_details.error_details}")
+    return False
+
+
+def stream_to_file(
+    speech_synthesizer: speechsdk.SpeechSynthesizer,
+    ssml: str,
+    output_path: str
+) -> tuple[bool, Optional[speechsdk.SpeechSynthesisCancellationDetails]]:
+    """
+    Synthesize SSML and stream the audio into output_path as it arrives.
+    
+    Audio is written to output_path + ".part" and renamed into place once complete,
+    so an interrupted run never leaves a truncated file that looks finished.
+    
+    Returns:
+        (True, None) on success, (False, details) if synthesis was canceled,
+        or (False, None) for an unexpected result (already reported)
+    """
+    # start_speaking returns as soon as audio starts arriving, so the file is
+    # written while the rest is still being synthesized
+    result = speech_synthesizer.start_speaking_ssml_async(ssml).get()
+    
+    if result.reason == speechsdk.ResultReason.SynthesizingAudioStarted:
+        stream = speechsdk.AudioDataStream(result)
+        buffer = bytes(STREAM_CHUNK_BYTES)
+        part_path = f"{output_path}.part"
+        try:
+            if output_path.endswith(".wav"):
+                with wave.open(part_path, 'wb') as wav_file:
+                    wav_file.setnchannels(1)
+                    wav_file.setsampwidth(2)
+                    wav_file.setframerate(SAMPLE_RATE)
+                    filled = stream.read_data(buffer)
+                    while filled > 0:
+                        wav_file.writeframes(memoryview(buffer)[:filled])
+                        filled = stream.read_data(buffer)
+            else:
+                # Compressed formats arrive ready to play
+                with open(part_path, 'wb') as audio_file:
+                    filled = stream.read_data(buffer)
+                    while filled > 0:
+                        audio_file.write(memoryview(buffer)[:filled])
+                        filled = stream.read_data(buffer)
+        except BaseException:
+            os.remove(part_path)
+            raise
+        
+        if stream.status != speechsdk.StreamStatus.Canceled:
+            os.replace(part_path, output_path)
+            return True, None
+        
+        # Do not leave a truncated file behind
+        os.remove(part_path)
+        return False, stream.cancellation_details
     elif result.reason == speechsdk.ResultReason.Canceled:
-        cancellation_details = result.cancellation_details
-        print(f"  ✗ Synthesis canceled: {cancellation_details.reason}")
-        if cancellation_details.reason == speechsdk.CancellationReason.Error:
-            if cancellation_details.error_details:
-                print(f"    Error details: {cancellation_details.error_details}")
-        return False
+        return False, result.cancellation_details
     else:
-        print(f"  ✗ Unknown result: {result.reason}")
+        print(f"  ✗ Unknown result for {output_path}: {result.reason}")
+        return False, None
+
+
+async def synthesize_jobs(
+    speech_configs: Sequence[speechsdk.SpeechConfig],
+    jobs: Iterable[tuple[str, str, float, str]],
+    max_workers: int = MAX_WORKERS,
+    use_cache: bool = True
+) -> set[str]:
+    """
+    Synthesize (text, voice_name, rate, output_path) jobs concurrently.
+    
+    Jobs are spread round-robin over speech_configs (one per Speech resource).
+    With use_cache=False every job is sent to the service, even if its audio is cached.
+    
+    Each blocking SDK call runs in a worker thread of an executor sized to max_workers
+    (the loop's default executor may have fewer threads), so this can also be awaited
+    from an application that already runs an event loop.
+    jobs may be a lazy iterable; the next job is only pulled once a worker is free.
+    The cache index is opened for the duration of the call and closed (with pending
+    cache writes flushed and old entries evicted) before it returns.
+    
+    Returns:
+        The output paths that were synthesized successfully
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_workers)
+    succeeded_outputs = set()
+    tasks = set()
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts") as executor:
+        async def run_job(speech_config: speechsdk.SpeechConfig, job: tuple[str, str, float, str]) -> None:
+            try:
+                if await loop.run_in_executor(executor, synthesize_text, speech_config, *job, use_cache):
+                    succeeded_outputs.add(job[3])
+            except Exception as e:
+                print(f"  ✗ Error synthesizing {job[3]}: {e}")
+            finally:
+                semaphore.release()
+        
+        await loop.run_in_executor(executor, open_cache_index)
+        try:
+            for i, job in enumerate(jobs):
+                await semaphore.acquire()
+                task = asyncio.create_task(run_job(speech_configs[i % len(speech_configs)], job))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            await loop.run_in_executor(executor, close_cache_index)
+    return succeeded_outputs
+
+
+def is_complete_output(output_path: str) -> bool:
+    """Return True if output_path exists and is larger than an empty WAV file."""
+    try:
+        return os.path.getsize(output_path) > WAV_HEADER_BYTES
+    except OSError:
         return False
 
 
-def read_utterances(file_path: str) -> list[tuple[int, str]]:
+def link_output(source_path: str, output_path: str) -> None:
+    """Make output_path a hard link to source_path, falling back to a copy."""
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    try:
+        os.link(source_path, output_path)
+    except OSError:
+        copy_into_place(source_path, output_path)
+
+
+def copy_into_place(source_path: str, output_path: str) -> None:
+    """Copy source_path to output_path via a ".part" file, so a partial copy is never seen as complete."""
+    part_path = f"{output_path}.part"
+    shutil.copyfile(source_path, part_path)
+    os.replace(part_path, output_path)
+
+
+def cache_key(ssml: str, extension: str) -> str:
+    """Return the cache key (hex SHA-256) for an SSML document in the given output format."""
+    # The key names the service output format (encoding and sample rate), not just the
+    # extension, so audio cached in another format is never served for this one
+    output_format = OUTPUT_FORMATS[extension].name
+    return hashlib.sha256(f"{extension}\n{output_format}\n{ssml}".encode("utf-8")).hexdigest()
+
+
+def record_cache_entry(key: str, cached_path: str, text: str, voice_name: str, rate: float) -> None:
+    """Record a cache entry in the index, or mark an existing one as just used."""
+    with _cache_lock, _cache_index:
+        _cache_index.execute(
+            "INSERT INTO cache (hash, path, size, atime, hits, text, voice, rate)"
+            " VALUES (?, ?, ?, ?, 0, ?, ?, ?)"
+            " ON CONFLICT (hash) DO UPDATE SET atime = excluded.atime, hits = hits + 1",
+            (key, cached_path, os.path.getsize(cached_path), time.time(), text, voice_name, rate),
+        )
+
+
+def cache_writer_loop() -> None:
+    """Copy finished outputs into the cache until a None sentinel is received."""
+    while (item := _cache_writes.get()) is not None:
+        output_path, cached_path, key, text, voice_name, rate = item
+        try:
+            # Copy under a temp name first so a partially copied file is never seen as a cache hit
+            temp_path = f"{cached_path}.tmp"
+            shutil.copyfile(output_path, temp_path)
+            os.replace(temp_path, cached_path)
+            record_cache_entry(key, cached_path, text, voice_name, rate)
+        except OSError as e:
+            print(f"  ✗ Error caching {output_path}: {e}")
+
+
+def open_cache_index() -> None:
+    """Open the cache index, reconcile it with the files in CACHE_DIR and start the cache writer."""
+    global _cache_index, _cache_writer
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _cache_index = sqlite3.connect(CACHE_INDEX, check_same_thread=False)
+    _cache_index.execute("PRAGMA journal_mode=WAL")
+    _cache_index.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        " hash TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL,"
+        " atime REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0,"
+        " text TEXT, voice TEXT, rate REAL)"
+    )
+    _cache_index.execute("CREATE INDEX IF NOT EXISTS cache_atime ON cache (atime)")
+    
+    # Files can be added or removed outside this script; untracked files start
+    # out as last used at their modification time
+    on_disk = {}
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            key, extension = os.path.splitext(entry.name)
+            if extension in OUTPUT_FORMATS:
+                stat = entry.stat()
+                on_disk[key] = (entry.path, stat.st_size, stat.st_mtime)
+    indexed = {key for key, in _cache_index.execute("SELECT hash FROM cache")}
+    with _cache_index:
+        _cache_index.executemany(
+            "DELETE FROM cache WHERE hash = ?",
+            [(key,) for key in indexed - on_disk.keys()],
+        )
+        _cache_index.executemany(
+            "INSERT INTO cache (hash, path, size, atime) VALUES (?, ?, ?, ?)",
+            [(key, *on_disk[key]) for key in on_disk.keys() - indexed],
+        )
+    
+    _cache_writer = threading.Thread(target=cache_writer_loop, name="cache-writer", daemon=True)
+    _cache_writer.start()
+
+
+def close_cache_index() -> None:
+    """Finish pending cache writes, evict entries over CACHE_MAX_BYTES and close the index."""
+    _cache_writes.put(None)
+    _cache_writer.join()
+    
+    total_size, = _cache_index.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()
+    while total_size > CACHE_MAX_BYTES:
+        evicted = _cache_index.execute(
+            "SELECT hash, path, size FROM cache ORDER BY atime LIMIT ?", (CACHE_EVICT_BATCH,)
+        ).fetchall()
+        if not evicted:
+            break
+        with _cache_index:
+            for key, path, size in evicted:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                _cache_index.execute("DELETE FROM cache WHERE hash = ?", (key,))
+                total_size -= size
+                if total_size <= CACHE_MAX_BYTES:
+                    break
+    _cache_index.close()
+
+
+def split_env_list(name: str) -> list[str]:
+    """Return the non-empty comma-separated values of environment variable name."""
+    return [value.strip() for value in os.environ.get(name, '').split(',') if value.strip()]
+
+
+def read_utterances(file_path: str) -> Iterator[tuple[int, str]]:
     """
     Read utterances from a text file, skipping comment lines.
     
+    Lines are yielded as they are read, so synthesis can start before the
+    whole file has been parsed.
+    
     Args:
         file_path: Path to the input text file
     
-    Returns:
-        List of tuples (line_number, text) for non-comment lines
+    Yields:
+        Tuples (line_number, text) for non-comment lines
     """
-    utterances = []
     with open(file_path, 'r', encoding='utf-8') as f:
         for line_num, line in enumerate(f, start=1):
             line = line.strip()
             # Skip empty lines and comments (lines starting with #)
             if line and not line.startswith('#'):
-                utterances.append((line_num, line))
-    return utterances
+                yield line_num, line
 
 
 def main():
@@ -157,30 +516,132 @@ def main():
         'input_file',
         help='Path to the input text file (one utterance per line, lines starting with # are skipped)'
     )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Re-synthesize every file with the service, ignoring existing outputs and the cache'
+    )
+    parser.add_argument(
+        '--format',
+        choices=['wav', 'mp3'],
+        default='wav',
+        help='Output audio format (default: wav; mp3 transfers and stores far fewer bytes)'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        help=f'Number of concurrent syntheses (default: $TTS_JOBS, or {MAX_WORKERS} per endpoint)'
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='List the output files that would be generated without calling the service'
+    )
     args = parser.parse_args()
+    if args.jobs is None and os.environ.get('TTS_JOBS'):
+        try:
+            args.jobs = int(os.environ['TTS_JOBS'])
+        except ValueError:
+            parser.error(f"TTS_JOBS must be an integer, got {os.environ['TTS_JOBS']!r}")
+        if args.jobs < 1:
+            parser.error('TTS_JOBS must be at least 1')
+    elif args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    
+    # Check input file exists
+    if not os.path.exists(args.input_file):
+        print(f"Error: Input file not found: {args.input_file}")
+        sys.exit(1)
+    
+    extension = f".{args.format}"
+    
+    # Jobs are produced lazily while the input file is read, so synthesis starts
+    # with the first line; repeated lines are synthesized once and linked to their
+    # other output paths afterwards
+    voice_sanitized_map = {voice_name: sanitize_filename(voice_name) for voice_name in VOICE_MODELS}
+    rate_str_map = {rate: str(rate).replace(".", "_") for rate in RATES}
+    first_outputs: dict[tuple[str, str, float], str] = {}
+    duplicates: list[tuple[str, str]] = []
+    existing_outputs = set()
+    # One directory read instead of a stat per candidate; only files that exist are checked further
+    existing_filenames = set(os.listdir(OUTPUT_DIR)) if not args.force and os.path.isdir(OUTPUT_DIR) else set()
+    utterance_count = 0
+    job_count = 0
+    
+    def iter_jobs() -> Iterator[tuple[str, str, float, str]]:
+        nonlocal utterance_count, job_count
+        for line_num, text in read_utterances(args.input_file):
+            utterance_count += 1
+            for voice_name in VOICE_MODELS:
+                for rate in RATES:
+                    # Create filename: line{N}_{voice}_{rate}.{wav,mp3}
+                    filename = f"line{line_num}_{voice_sanitized_map[voice_name]}_rate{rate_str_map[rate]}{extension}"
+                    output_path = os.path.join(OUTPUT_DIR, filename)
+                    first_output = first_outputs.setdefault((text, voice_name, rate), output_path)
+                    # Reruns only synthesize what is missing (e.g. after a crash or throttling)
+                    if filename in existing_filenames and is_complete_output(output_path):
+                        existing_outputs.add(output_path)
+                        continue
+                    if first_output != output_path:
+                        duplicates.append((first_output, output_path))
+                        continue
+                    job_count += 1
+                    yield text, voice_name, rate, output_path
+    
+    if args.dry_run:
+        # Planning only needs the SSML, the cache keys and the output directory,
+        # so a dry run works without credentials or an endpoint
+        print(f"Voice models: {len(VOICE_MODELS)}")
+        print(f"Rates: {RATES}")
+        print("-" * 60)
+        
+        synthesize_count = 0
+        cached_count = 0
+        for text, voice_name, rate, output_path in iter_jobs():
+            key = cache_key(create_ssml(text, voice_name, rate), extension)
+            if not args.force and os.path.exists(os.path.join(CACHE_DIR, f"{key}{extension}")):
+                cached_count += 1
+                print(f"  Cached: {output_path}")
+            else:
+                synthesize_count += 1
+                print(f"  Synthesize: {output_path}")
+        for source_path, output_path in duplicates:
+            print(f"  Link: {output_path} -> {source_path}")
+        
+        print("-" * 60)
+        print("\nDry run complete!")
+        print(f"  Utterances: {utterance_count}")
+        print(f"  To synthesize (API calls): {synthesize_count}")
+        print(f"  From cache: {cached_count}")
+        print(f"  To link (repeated lines): {len(duplicates)}")
+        print(f"  Skipped (already exist): {len(existing_outputs)}")
+        return
     
     # Check environment variables
-    speech_key = os.environ.get('SPEECH_KEY')  # Optional - for local development fallback
-    endpoint = os.environ.get('ENDPOINT')
+    # ENDPOINTS / SPEECH_KEYS take comma-separated lists to fan out over several resources
+    endpoints = split_env_list('ENDPOINTS') or split_env_list('ENDPOINT')
+    speech_keys = split_env_list('SPEECH_KEYS') or split_env_list('SPEECH_KEY')  # Optional - for local development fallback
     speech_region = os.environ.get('SPEECH_REGION', '')  # Required for token-based auth
     
-    if not endpoint:
+    if not endpoints:
         print("Error: ENDPOINT environment variable is not set.")
         print("Set it with: export ENDPOINT=https://YourServiceRegion.api.cognitive.microsoft.com")
         sys.exit(1)
     
-    # Check input file exists
-    if not os.path.exists(args.input_file):
-        print(f"Error: Input file not found: {args.input_file}")
+    # A single key is shared by all endpoints; otherwise keys pair up with endpoints
+    if len(speech_keys) == 1:
+        speech_keys *= len(endpoints)
+    if speech_keys and len(speech_keys) != len(endpoints):
+        print(f"Error: {len(speech_keys)} speech keys given for {len(endpoints)} endpoints.")
         sys.exit(1)
     
-    # Create output directory
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
     # Configure Speech SDK - use API key if provided, otherwise use DefaultAzureCredential
-    if speech_key:
+    if speech_keys:
         print("Using API key credential")
-        speech_config = speechsdk.SpeechConfig(subscription=speech_key, endpoint=endpoint)
+        speech_configs = [
+            speechsdk.SpeechConfig(subscription=speech_key, endpoint=endpoint)
+            for speech_key, endpoint in zip(speech_keys, endpoints)
+        ]
     else:
         # Use DefaultAzureCredential (supports managed identity, Azure CLI, etc.)
         print("Using DefaultAzureCredential (managed identity)")
@@ -191,47 +652,45 @@ def main():
         
         credential = DefaultAzureCredential()
         token = credential.get_token("https://cognitiveservices.azure.com/.default")
-        speech_config = speechsdk.SpeechConfig(endpoint=endpoint)
-    speech_config.speech_synthesis_language = LOCALE
-    
-    # Read utterances from file
-    utterances = read_utterances(args.input_file)
-    
-    if not utterances:
-        print("No utterances found in the input file (all lines are empty or comments).")
-        sys.exit(0)
+        speech_configs = [speechsdk.SpeechConfig(endpoint=endpoint) for endpoint in endpoints]
+    for speech_config in speech_configs:
+        speech_config.speech_synthesis_language = LOCALE
+        speech_config.set_speech_synthesis_output_format(OUTPUT_FORMATS[extension])
     
-    print(f"Found {len(utterances)} utterance(s) to synthesize.")
+    print(f"Endpoints: {len(speech_configs)}")
     print(f"Voice models: {len(VOICE_MODELS)}")
     print(f"Rates: {RATES}")
-    print(f"Total files to generate: {len(utterances) * len(VOICE_MODELS) * len(RATES)}")
     print("-" * 60)
     
-    success_count = 0
-    error_count = 0
+    # Each resource has its own concurrency limit, so by default the worker count scales with them
+    max_workers = args.jobs or MAX_WORKERS * len(speech_configs)
+    succeeded_outputs = asyncio.run(
+        synthesize_jobs(speech_configs, iter_jobs(), max_workers=max_workers, use_cache=not args.force)
+    )
     
-    for line_num, text in utterances:
-        print(f"\nLine {line_num}: \"{text[:50]}{'...' if len(text) > 50 else ''}\"")
-        
-        for voice_name in VOICE_MODELS:
-            for rate in RATES:
-                # Create filename: line{N}_{voice}_{rate}.wav
-                voice_sanitized = sanitize_filename(voice_name)
-                rate_str = str(rate).replace(".", "_")
-                filename = f"line{line_num}_{voice_sanitized}_rate{rate_str}.wav"
-                output_path = os.path.join(OUTPUT_DIR, filename)
-                
-                print(f"  Synthesizing with {voice_name} at rate {rate}...")
-                
-                if synthesize_text(speech_config, text, voice_name, rate, output_path):
-                    success_count += 1
-                else:
-                    error_count += 1
+    if not utterance_count:
+        print("No utterances found in the input file (all lines are empty or comments).")
+        sys.exit(0)
+    
+    success_count = len(succeeded_outputs)
+    error_count = job_count - success_count
+    skipped_count = len(existing_outputs)
+    succeeded_outputs |= existing_outputs
+    
+    for source_path, output_path in duplicates:
+        if source_path in succeeded_outputs:
+            link_output(source_path, output_path)
+            print(f"  ✓ Linked: {output_path}")
+            success_count += 1
+        else:
+            error_count += 1
     
     print("-" * 60)
     print(f"\nSynthesis complete!")
+    print(f"  Utterances: {utterance_count}")
     print(f"  Successful: {success_count}")
     print(f"  Failed: {error_count}")
+    print(f"  Skipped (already exist): {skipped_count}")
     print(f"  Output directory: {OUTPUT_DIR}")
 
 